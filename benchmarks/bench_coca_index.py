@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the memory-mapped COCA index against loading the word list as dicts
+
+Starts a fresh interpreter for each approach, loads the COCA60000 list the
+way a worker would before serving the vocabulary test, and reports the load
+time and the peak RSS growth. Also times word -> rank and rank -> word
+lookups on the index.
+
+Usage:
+    python benchmarks/bench_coca_index.py [--repeat N]
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from coca_index import open_index
+
+COCA_FILE = os.path.join(REPO_DIR, 'data', 'COCA60000.txt')
+
+# Each snippet loads the list and prints (seconds, peak RSS growth in KiB)
+MEASURE = '''
+import json, resource, time
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+{load}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before]))
+'''
+
+LOADERS = {
+    'dicts': '''
+words = []
+with open({path!r}, 'r') as f:
+    for i, line in enumerate(f):
+        word = line.strip()
+        if word:
+            words.append({{'word': word, 'rank': i + 1}})
+''',
+    'mmap index': '''
+from array import array
+from coca_index import open_index
+index = open_index({path!r})
+ranks = array('I', index.ranks())
+''',
+}
+
+def measure(loader, repeat):
+    """Run a loader in fresh interpreters and keep the fastest run"""
+    code = MEASURE.format(load=LOADERS[loader].format(path=COCA_FILE))
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output))
+    return min(runs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per approach')
+    args = parser.parse_args()
+
+    # Build the index up front so its one-off build is not timed
+    index = open_index(COCA_FILE)
+
+    print(f"{os.path.basename(COCA_FILE)}: {len(index):,} distinct words, "
+          f"index {os.path.getsize(COCA_FILE[:-4] + '.idx') / 1024:,.0f} KiB")
+    for loader in LOADERS:
+        elapsed, rss = measure(loader, args.repeat)
+        print(f"  {loader:<10} load {elapsed * 1000:7.1f} ms  RSS +{rss / 1024:6.1f} MiB")
+
+    words = [word for _, word in index.iter_ranked()][::6]
+    ranks = list(range(1, index.max_rank + 1))[::6]
+    for name, run in (('rank_of', lambda: [index.rank_of(word) for word in words]),
+                      ('word_at', lambda: [index.word_at(rank) for rank in ranks])):
+        best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print(f"  {name:<10} {best / len(words) * 1e6:7.2f} us per lookup")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark of inflection folding with the lemma table on the bundled EPUBs
+
+Reports the one-off cost of building and opening the lemma table, then the
+cost per 10k tokens of extracting words with and without the fold stage and
+of folding every token, along with how much folding shrinks the vocabulary.
+
+Usage:
+    python benchmarks/bench_lemma_fold.py [--repeat N]
+"""
+import os
+import sys
+import glob
+import time
+import timeit
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import get_app_dirs, extract_english_words
+from tokenizer import find_words
+from epub_processor import iter_epub_texts
+from lemma_table import build_lemma_table, get_lemma_table
+from vocab_count_test import COCA_FILE
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        build_lemma_table(COCA_FILE, os.path.join(directory, 'lemmas'))
+        print(f"build table: {(time.perf_counter() - start) * 1000:,.0f} ms")
+    start = time.perf_counter()
+    table = get_lemma_table()
+    print(f"open table:  {(time.perf_counter() - start) * 1000:,.1f} ms ({len(table):,} forms)")
+    
+    for epub_path in sorted(glob.glob(os.path.join(get_app_dirs()['EPUB_DIR'], '*.epub'))):
+        text = '\n'.join(iter_epub_texts(epub_path))
+        tokens = find_words(text)
+        per_10k = 10000 / len(tokens)
+        plain = extract_english_words(text)
+        folded = extract_english_words(text, fold=True)
+        print(f"{os.path.basename(epub_path)[:60]}: {len(tokens):,} tokens, "
+              f"{len(plain):,} -> {len(folded):,} words after folding")
+        
+        for name, run in (('extract', lambda: extract_english_words(text)),
+                          ('extract + fold', lambda: extract_english_words(text, fold=True)),
+                          ('fold every token', lambda: table.fold_words(tokens))):
+            best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+            print(f"  {name:<16} {best * per_10k * 1000:8.2f} ms per 10k tokens")
+
+if __name__ == '__main__':
+    main()
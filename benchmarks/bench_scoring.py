@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the NumPy batch scoring against per-submission scoring
+
+Scores synthetic assessment submissions one at a time with
+VocabularyAssessment.calculate_score, all at once with score_tests, and
+again from their stored level proportions with rescore_results, checking
+that every result is identical.
+
+Usage:
+    python benchmarks/bench_scoring.py [--submissions N] [--repeat N]
+"""
+import os
+import sys
+import random
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocab_assessment import VOCAB_LEVELS, VocabularyAssessment, score_tests, rescore_results
+
+def make_submissions(count, rng):
+    """Build assessment submissions of 50 words"""
+    levels = list(VOCAB_LEVELS)
+    submissions = []
+    for _ in range(count):
+        skill = rng.random()
+        words = [{'word': f'word{i}', 'level': levels[i % len(levels)]} for i in range(50)]
+        answers = {w['word']: rng.random() < skill * (1.2 - levels.index(w['level']) / 5) for w in words}
+        submissions.append(({'words': words, 'test_id': rng.randint(1000, 9999)}, answers))
+    return submissions
+
+def report(name, count, runs):
+    """Print the best time of each run and the speedup over the first"""
+    print(f"{name} ({count:,} submissions):")
+    baseline = None
+    for label, seconds in runs:
+        baseline = baseline or seconds
+        print(f"  {label:<22} {seconds * 1000:8.1f} ms  {baseline / seconds:5.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=5000, help='submissions scored per run')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per implementation')
+    args = parser.parse_args()
+    
+    submissions = make_submissions(args.submissions, random.Random(0))
+    best = lambda run: min(timeit.repeat(run, number=1, repeat=args.repeat))
+    # calculate_score does not touch the instance, so no word lists are loaded
+    calculate_score = VocabularyAssessment.calculate_score
+    
+    results = score_tests(submissions)
+    assert results == [calculate_score(None, *submission) for submission in submissions]
+    assert rescore_results(results) == results
+    report('calculate_score', len(submissions), [
+        ('dicts, one at a time', best(lambda: [calculate_score(None, *s) for s in submissions])),
+        ('numpy, batch', best(lambda: score_tests(submissions))),
+        ('numpy, rescore stored', best(lambda: rescore_results(results))),
+    ])
+
+if __name__ == '__main__':
+    main()
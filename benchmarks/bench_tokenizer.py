@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the tokenizer against the original extract_english_words
+
+Runs both implementations over the bundled attachment texts and reports the
+best time of several runs for each.
+
+Usage:
+    python benchmarks/bench_tokenizer.py [--repeat N]
+"""
+import os
+import re
+import sys
+import glob
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import get_app_dirs
+from tokenizer import extract_words, iter_words
+
+def legacy_extract_english_words(text):
+    """The implementation extract_english_words used before the tokenizer module"""
+    pattern = r'\b[a-zA-Z]+-?[a-zA-Z]*\'?[a-zA-Z]*\b'
+    words = re.findall(pattern, text)
+    unique_words = list(set([word.lower() for word in words]))
+    unique_words.sort()
+    return unique_words
+
+def load_corpus():
+    """Concatenate the bundled attachment texts"""
+    texts = []
+    for path in sorted(glob.glob(os.path.join(get_app_dirs()['ATTACHMENT_DIR'], '*.txt'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    return '\n'.join(texts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per implementation')
+    args = parser.parse_args()
+    
+    text = load_corpus()
+    if not text:
+        print("No attachment texts found")
+        return
+    
+    assert extract_words(text) == legacy_extract_english_words(text)
+    
+    cases = [
+        ('legacy extract_english_words', lambda: legacy_extract_english_words(text)),
+        ('tokenizer.extract_words', lambda: extract_words(text)),
+        ('tokenizer.extract_words(counts=True)', lambda: extract_words(text, counts=True)),
+        ('tokenizer.iter_words (set)', lambda: set(iter_words(text))),
+    ]
+    
+    print(f"Corpus: {len(text):,} characters, {len(extract_words(text)):,} unique words")
+    baseline = None
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:<40} {best * 1000:8.2f} ms  {baseline / best:5.2f}x")
+
+if __name__ == '__main__':
+    main()
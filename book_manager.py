@@ -1,135 +1,215 @@
 import os
 from utils import get_app_dirs
+from storage import create_word_store
+from lemma_table import get_lemma_table
 
 # Get the vocabulary books directory
 VOCAB_DIR = get_app_dirs()['VOCAB_DIR']
+# Done words are kept in a book of their own
+DONE_BOOK = 'done'
 # Done words file path
-DONE_WORDS_FILE = os.path.join(VOCAB_DIR, 'done.txt')
+DONE_WORDS_FILE = os.path.join(VOCAB_DIR, f'{DONE_BOOK}.txt')
+
+# Book storage: an in-memory cache of the book files, or the SQLite database
+_store = create_word_store(VOCAB_DIR)
 
 def get_all_books():
     """Get all vocabulary books"""
-    books = []
-    for file in os.listdir(VOCAB_DIR):
-        if file.endswith('.txt'):
-            books.append(file[:-4])  # Remove .txt extension
-    return books
+    return _store.list_books()
 
 def get_words_from_book(book_name):
     """Get all words from a vocabulary book"""
-    book_path = os.path.join(VOCAB_DIR, f"{book_name}.txt")
-    if not os.path.exists(book_path):
-        return []
-    
-    with open(book_path, 'r', encoding='utf-8') as f:
-        words = [line.strip() for line in f if line.strip()]
-    return words
+    return _store.get_words(book_name)
+
+def get_book_page(book_name, offset=0, limit=None, prefix=None):
+    """
+    Get a page of words from a vocabulary book
+    
+    Args:
+        book_name (str): Name of the vocabulary book
+        offset (int): Number of matching words to skip
+        limit (int): Maximum number of words to return, None for all
+        prefix (str): Only return words starting with this prefix
+        
+    Returns:
+        tuple: (words on the page in book order, total number of matching words)
+    """
+    return _store.get_page(book_name, offset, limit, prefix)
+
+def get_book_version(book_name):
+    """Get a string that changes whenever a book's words change, or None if it does not exist"""
+    return _store.get_version(book_name)
 
 def add_word_to_book(book_name, word):
     """Add a single word to a vocabulary book"""
-    book_path = os.path.join(VOCAB_DIR, f"{book_name}.txt")
-    
-    # Check if word already exists
-    existing_words = get_words_from_book(book_name)
-    if word in existing_words:
-        return False
-    
-    with open(book_path, 'a', encoding='utf-8') as f:
-        f.write(f"{word}\n")
-    return True
+    with _store.locked(book_name):
+        # Check if word already exists
+        if _store.contains(book_name, word):
+            return False
+        
+        _store.append(book_name, [word])
+        return True
 
-def add_words_to_book(book_name, words):
-    """Add multiple words to a vocabulary book"""
-    book_path = os.path.join(VOCAB_DIR, f"{book_name}.txt")
-    
-    # Check for existing words
-    existing_words = get_words_from_book(book_name)
-    new_words = [word for word in words if word not in existing_words]
-    
-    if not new_words:
-        return 0
-    
-    with open(book_path, 'a', encoding='utf-8') as f:
-        for word in new_words:
-            f.write(f"{word}\n")
-    return len(new_words)
+def add_words_to_book(book_name, words, skip_done=True, fold=False):
+    """
+    Add multiple words to a vocabulary book
+    
+    The incoming words are merged in a single linear pass: each one is checked
+    against the book and the rest of the batch, and words already marked as
+    done are skipped unless skip_done is False. The book stays locked from the
+    duplicate check to the write, so concurrent batches never add a word twice.
+    
+    Args:
+        book_name (str): Name of the vocabulary book
+        words (list): Words to add
+        skip_done (bool): Whether to skip words listed in done.txt
+        fold (bool): Fold regular inflections to their lemma first, so
+                     "habits" is added as, or counted as a duplicate of, "habit";
+                     done words are folded the same way before the check
+        
+    Returns:
+        dict: Number of words 'added', 'duplicates' (already in the book or
+              repeated in the batch) and 'already_done'
+    """
+    lemmas = get_lemma_table() if fold else None
+    if lemmas:
+        words = lemmas.fold_words(words)
+    
+    if skip_done and book_name != DONE_BOOK:
+        done_words = _store.get_word_set(DONE_BOOK)
+        if lemmas:
+            # A done "habits" also covers the folded "habit"
+            done_words = done_words.union(lemmas.fold_words(done_words))
+    else:
+        done_words = frozenset()
+    
+    with _store.locked(book_name):
+        existing_words = _store.get_word_set(book_name)
+        new_words = []
+        seen = set()
+        duplicates = 0
+        already_done = 0
+        for word in words:
+            if word in existing_words or word in seen:
+                duplicates += 1
+                continue
+            seen.add(word)
+            if word in done_words:
+                already_done += 1
+            else:
+                new_words.append(word)
+        
+        _store.append(book_name, new_words)
+    return {
+        'added': len(new_words),
+        'duplicates': duplicates,
+        'already_done': already_done
+    }
 
 def create_book(book_name):
     """Create a new vocabulary book"""
-    book_path = os.path.join(VOCAB_DIR, f"{book_name}.txt")
-    if os.path.exists(book_path):
-        return False
-    
-    with open(book_path, 'w', encoding='utf-8'):
-        pass  # Just create an empty file
-    return True
+    return _store.create(book_name)
 
 def book_exists(book_name):
     """Check if a vocabulary book exists"""
-    book_path = os.path.join(VOCAB_DIR, f"{book_name}.txt")
-    return os.path.exists(book_path)
+    return _store.exists(book_name)
 
 def mark_word_as_done(word):
-    """Mark a word as done (recognized) by adding it to done.txt and removing from all vocabulary books"""
-    # Ensure done.txt exists
-    if not os.path.exists(DONE_WORDS_FILE):
-        with open(DONE_WORDS_FILE, 'w', encoding='utf-8'):
-            pass  # Create an empty file if it doesn't exist
-    
-    # Check if word is already marked as done
-    done_words = get_done_words()
-    if word in done_words:
-        return False
-    
-    # Add word to done.txt
-    with open(DONE_WORDS_FILE, 'a', encoding='utf-8') as f:
-        f.write(f"{word}\n")
+    """
+    Mark a word as done (recognized) by adding it to done.txt and removing from all vocabulary books
+    
+    Returns:
+        list: Books the word was removed from, or None if it was already done
+    """
+    with _store.locked(DONE_BOOK):
+        # Check if word is already marked as done
+        if _store.contains(DONE_BOOK, word):
+            return None
+        
+        # Add word to done.txt (created if it doesn't exist)
+        _store.append(DONE_BOOK, [word])
     
     # Remove from all vocabulary books
-    removed_from_books = remove_word_from_all_books(word)
+    return remove_word_from_all_books(word)
+
+def mark_words_as_done(words):
+    """
+    Mark many words as done at once
     
-    return True
+    done.txt is appended to once, and each vocabulary book holding any of the
+    words gets a single write of its removals to its log, no matter how many
+    of the words it contains.
+    
+    Args:
+        words (list): Words to mark as done
+        
+    Returns:
+        dict: Newly marked words, words that were already done, and the number
+              of words removed from each affected book
+    """
+    with _store.locked(DONE_BOOK):
+        done_words = _store.get_word_set(DONE_BOOK)
+        marked = []
+        already_done = []
+        seen = set()
+        for word in words:
+            if word in seen:
+                continue
+            seen.add(word)
+            if word in done_words:
+                already_done.append(word)
+            else:
+                marked.append(word)
+        
+        # Add all new words to done.txt in one write
+        _store.append(DONE_BOOK, marked)
+    
+    # Log the removals of each affected vocabulary book in one write
+    removed_from_books = {}
+    for book, book_words in sorted(_store.books_containing_words(marked).items()):
+        if book == DONE_BOOK:
+            continue
+        removed_from_books[book] = _store.remove_words(book, book_words)
+    
+    return {
+        'marked': marked,
+        'already_done': already_done,
+        'removed_from_books': removed_from_books
+    }
 
 def get_done_words():
     """Get all words marked as done"""
-    if not os.path.exists(DONE_WORDS_FILE):
-        return []
-    
-    with open(DONE_WORDS_FILE, 'r', encoding='utf-8') as f:
-        words = [line.strip() for line in f if line.strip()]
-    return words
+    return _store.get_words(DONE_BOOK)
+
+def get_done_version():
+    """Get a string that changes whenever the done words change, or None if there are none"""
+    return _store.get_version(DONE_BOOK)
 
 def remove_word_from_book(book_name, word):
     """Remove a word from a vocabulary book"""
-    book_path = os.path.join(VOCAB_DIR, f"{book_name}.txt")
-    if not os.path.exists(book_path):
+    if not book_exists(book_name):
         return False
     
-    # Read all words except the one to remove
-    with open(book_path, 'r', encoding='utf-8') as f:
-        words = [line.strip() for line in f if line.strip() and line.strip() != word]
-    
-    # Write the words back to the file
-    with open(book_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(words) + ('\n' if words else ''))
-    
+    _store.remove(book_name, word)
     return True
 
 def remove_word_from_all_books(word):
-    """Remove a word from all vocabulary books"""
-    books = get_all_books()
+    """
+    Remove a word from all vocabulary books
+    
+    Only the books listed for the word in the store's reverse index are touched.
+    
+    Returns:
+        list: Names of the books the word was removed from
+    """
     removed_from = []
     
-    for book in books:
+    for book in _store.books_containing(word):
         # Skip the done.txt file (without extension)
-        if book == 'done':
+        if book == DONE_BOOK:
             continue
-            
-        # Get words from the book
-        book_words = get_words_from_book(book)
         
-        # If word exists in the book, remove it
-        if word in book_words:
-            remove_word_from_book(book, word)
+        if _store.remove(book, word):
             removed_from.append(book)
     
     return removed_from
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Binary, memory-mapped COCA frequency index
+
+Compiles a COCA word list (one word per line, most frequent first, so a
+word's rank is its 1-based line number) into a compact binary file that is
+opened with mmap. Every worker process maps the same file, so the pages are
+shared instead of each worker holding its own tens of thousands of Python
+objects.
+
+File layout (all integers little-endian uint32):
+
+    header        magic b'COCAIDX1', max_rank, unique_count, table_size
+    offsets       max_rank + 2 entries: word r is table[offsets[r]:offsets[r + 1]]
+                  (rank 0 and blank lines are empty)
+    sorted_ranks  unique_count entries: the lowest rank of each distinct word,
+                  ordered by the word's UTF-8 bytes
+    table         the words in rank order, UTF-8 encoded, concatenated
+
+rank -> word is an O(1) slice and word -> rank is an O(log n) binary search
+over sorted_ranks. A batch of words is looked up in one sorted merge against
+sorted_ranks, each search starting where the previous word's ended, so no
+word -> rank table is ever built in Python.
+
+Indexes are built on first use next to their word list (<list>.idx) and
+rebuilt whenever the list is newer. They can also be built ahead of time:
+
+    python3 coca_index.py build [data/COCA60000.txt ...]
+"""
+
+import os
+import mmap
+import struct
+import argparse
+from array import array
+from bisect import bisect_left
+from file_io import file_lock, atomic_write
+
+MAGIC = b'COCAIDX1'
+_HEADER = struct.Struct('<8sIII')
+
+
+def index_path(list_path):
+    """Get the path of the index compiled from a word list"""
+    return os.path.splitext(list_path)[0] + '.idx'
+
+
+def build_index(list_path, output_path=None):
+    """
+    Compile a word list into a binary index
+
+    Args:
+        list_path (str): Word list, one word per line in rank order
+        output_path (str): Where to write the index, defaults to index_path(list_path)
+
+    Returns:
+        str: Path of the written index
+    """
+    output_path = output_path or index_path(list_path)
+    with open(list_path, 'r', encoding='utf-8') as f:
+        words = [line.strip() for line in f]
+    max_rank = len(words)
+
+    offsets = array('I', [0, 0])  # Rank 0 is unused
+    table = bytearray()
+    lowest_rank = {}
+    for rank, word in enumerate(words, 1):
+        table += word.encode('utf-8')
+        offsets.append(len(table))
+        if word and word not in lowest_rank:
+            lowest_rank[word] = rank
+
+    sorted_words = sorted(lowest_rank, key=lambda w: w.encode('utf-8'))
+    sorted_ranks = array('I', (lowest_rank[word] for word in sorted_words))
+    if array('I').itemsize != 4:
+        raise RuntimeError('uint32 arrays are required to build the index')
+    if struct.pack('=I', 1) != struct.pack('<I', 1):
+        offsets.byteswap()
+        sorted_ranks.byteswap()
+
+    header = _HEADER.pack(MAGIC, max_rank, len(sorted_ranks), len(table))
+    atomic_write(output_path, header + offsets.tobytes() + sorted_ranks.tobytes() + bytes(table))
+    return output_path
+
+
+class _SortedWords:
+    """Sequence view of the distinct words in byte order, for bisect"""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return self._index.unique_count
+
+    def __getitem__(self, i):
+        return self._index._word_bytes(self._index._sorted_ranks[i])
+
+
+class CocaIndex:
+    """Read-only view of a compiled COCA index"""
+
+    def __init__(self, path):
+        """
+        Map an index file into memory
+
+        Args:
+            path (str): Path of a file written by build_index
+
+        Raises:
+            ValueError: If the file is not a COCA index
+        """
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.max_rank, self.unique_count, table_size = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a COCA index")
+
+        view = memoryview(self._map)
+        offsets_start = _HEADER.size
+        sorted_start = offsets_start + 4 * (self.max_rank + 2)
+        self._table_start = sorted_start + 4 * self.unique_count
+        # Typed views straight onto the mapped pages; nothing is copied
+        self._offsets = view[offsets_start:sorted_start].cast('I')
+        self._sorted_ranks = view[sorted_start:self._table_start].cast('I')
+        self._sorted_words = _SortedWords(self)
+
+    def __len__(self):
+        """Number of distinct words in the index"""
+        return self.unique_count
+
+    def _word_bytes(self, rank):
+        """Get the UTF-8 bytes of the word at a rank"""
+        start = self._table_start + self._offsets[rank]
+        end = self._table_start + self._offsets[rank + 1]
+        return self._map[start:end]
+
+    def word_at(self, rank):
+        """
+        Get the word at a frequency rank in O(1)
+
+        Returns:
+            str: The word, or None if the rank is out of range or its line is blank
+        """
+        if not 1 <= rank <= self.max_rank:
+            return None
+        return self._word_bytes(rank).decode('utf-8') or None
+
+    def rank_of(self, word):
+        """
+        Get the frequency rank of a word in O(log n)
+
+        Returns:
+            int: The word's lowest rank, or None if it is not in the list
+        """
+        return self._find(word.encode('utf-8'), 0)[1]
+
+    def _find(self, target, low):
+        """
+        Binary-search sorted_ranks for a word's UTF-8 bytes from position low
+
+        Returns:
+            tuple: (insertion position, the word's rank or None)
+        """
+        i = bisect_left(self._sorted_words, target, low)
+        if i < self.unique_count:
+            rank = self._sorted_ranks[i]
+            if self._word_bytes(rank) == target:
+                return i, rank
+        return i, None
+
+    def rank_of_many(self, words):
+        """
+        Get the frequency ranks of many words in one pass over the index
+
+        The distinct words are sorted by their UTF-8 bytes and merged against
+        sorted_ranks: each search starts where the previous one ended, so the
+        batch costs one sort plus narrowing binary searches, and nothing but
+        the batch itself is held in memory.
+
+        Args:
+            words (list): Words to look up
+
+        Returns:
+            list: Lowest rank of each word (None where missing), in input order
+        """
+        ranks = {}
+        low = 0
+        for target in sorted({word.encode('utf-8') for word in words}):
+            low, ranks[target] = self._find(target, low)
+        return [ranks[word.encode('utf-8')] for word in words]
+
+    def __contains__(self, word):
+        return self.rank_of(word) is not None
+
+    def ranks(self):
+        """Yield the rank of every non-blank line without decoding the words"""
+        offsets = self._offsets
+        return (rank for rank in range(1, self.max_rank + 1) if offsets[rank] != offsets[rank + 1])
+
+    def iter_ranked(self):
+        """Yield (rank, word) for every non-blank line, in rank order"""
+        for rank in range(1, self.max_rank + 1):
+            word = self._word_bytes(rank)
+            if word:
+                yield rank, word.decode('utf-8')
+
+    def iter_sorted(self):
+        """Yield (word, rank) for every distinct word, sorted by word"""
+        for rank in self._sorted_ranks:
+            yield self._word_bytes(rank).decode('utf-8'), rank
+
+
+def open_index(list_path):
+    """
+    Open the index of a word list, building it first if it is missing or stale
+
+    Returns:
+        CocaIndex: The mapped index, or None if the word list does not exist
+    """
+    if not os.path.exists(list_path):
+        return None
+    path = index_path(list_path)
+    with file_lock(path):
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(list_path):
+            build_index(list_path, path)
+    return CocaIndex(path)
+
+
+if __name__ == '__main__':
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+    parser = argparse.ArgumentParser(description='Compile COCA word lists into binary indexes')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='Build the index of each word list')
+    build_parser.add_argument('lists', nargs='*',
+                              default=[os.path.join(data_dir, name) for name in ('COCA60000.txt', 'COCA20000.txt')],
+                              help='Word lists to compile (default: the bundled COCA lists)')
+    args = parser.parse_args()
+
+    for list_path in args.lists:
+        path = build_index(list_path)
+        print(f"Built {path} ({os.path.getsize(path)} bytes)")
@@ -0,0 +1,112 @@
+"""
+On-disk cache with size-based LRU eviction
+
+Each entry is a gzip-compressed JSON file named after the SHA-256 of its key.
+Reading an entry touches its mtime, so once the cache grows past its size
+limit the least recently used entries are evicted first. Entries can also be
+given a time-to-live, after which they are treated as missing.
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import time
+import tempfile
+
+
+class DiskCache:
+    """Small JSON cache stored as one compressed file per entry"""
+
+    def __init__(self, directory, max_bytes, ttl=None):
+        """
+        Initialize the cache
+
+        Args:
+            directory (str): Directory holding the cache entries
+            max_bytes (int): Total size the entries may occupy on disk
+            ttl (float): Seconds an entry stays valid after it is stored,
+                         or None to keep entries until they are evicted
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        """Get the file path of the entry for a key"""
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json.gz")
+
+    def get(self, key):
+        """
+        Get the value stored for a key
+
+        Returns:
+            The cached value, or None if there is no readable, unexpired entry
+        """
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Error reading cache entry {path}: {e}")
+            return None
+
+        if not isinstance(entry, dict) or 'stored_at' not in entry:
+            return None
+        if self.ttl is not None and time.time() - entry['stored_at'] > self.ttl:
+            self.delete(key)
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass
+        return entry['value']
+
+    def set(self, key, value):
+        """Store a JSON-serializable value for a key and evict old entries"""
+        path = self._path(key)
+        entry = {'stored_at': time.time(), 'value': value}
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        self.evict()
+
+    def delete(self, key):
+        """Remove the entry for a key if there is one"""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json.gz'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Removed by another writer
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
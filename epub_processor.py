@@ -1,90 +1,251 @@
 import os
-import zipfile
+import hashlib
 import tempfile
-import shutil
+import threading
+import multiprocessing
+import posixpath
+import zipfile
+from collections import Counter, deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
+from urllib.parse import unquote
 from werkzeug.utils import secure_filename
-from utils import get_app_dirs, get_timestamp_filename, extract_english_words
+from utils import (get_app_dirs, get_timestamp_filename, extract_english_words,
+                   extract_english_words_from_texts, EPUB_POOL_SIZE, EPUB_PARALLEL_THRESHOLD,
+                   EPUB_CACHE_MAX_BYTES)
+from disk_cache import DiskCache
+from html_text import extract_text
 
 # Get directories
 ATTACHMENT_DIR = get_app_dirs()['ATTACHMENT_DIR']
 EPUB_DIR = get_app_dirs()['EPUB_DIR']
+CACHE_DIR = get_app_dirs()['CACHE_DIR']
+
+# Location of the container file that points at the OPF package document
+CONTAINER_PATH = 'META-INF/container.xml'
+# Manifest media types that hold readable chapter content
+CONTENT_MEDIA_TYPES = {'application/xhtml+xml', 'text/html'}
+
+# Extraction results of previously uploaded EPUBs, keyed by SHA-256 of the file
+_epub_cache = DiskCache(os.path.join(CACHE_DIR, 'epub'), EPUB_CACHE_MAX_BYTES)
+
+# Process pools for parallel chapter parsing by worker count, created on first use
+_pools = {}
+_pools_lock = threading.Lock()
+# Job threads run alongside the parsing, so workers are never forked from this process
+_POOL_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+def get_opf_paths(zip_ref):
+    """Get the archive paths of the OPF package documents in an EPUB"""
+    try:
+        root = ET.fromstring(zip_ref.read(CONTAINER_PATH))
+        paths = [rootfile.get('full-path') for rootfile in root.iter('{*}rootfile')
+                 if rootfile.get('full-path')]
+    except (KeyError, ET.ParseError) as e:
+        print(f"Error reading EPUB container: {e}")
+        paths = []
+    
+    # Fall back to any OPF file in the archive if the container is missing or empty
+    if not paths:
+        paths = [name for name in zip_ref.namelist() if name.endswith('.opf')]
+    return paths
+
+def get_content_paths(zip_ref):
+    """
+    Get the archive paths of the chapter documents in an EPUB, in reading order
+    
+    The OPF spine defines the order; manifest content items are used if the
+    spine is empty, and any HTML/XHTML file in the archive if there is no OPF.
+    
+    Args:
+        zip_ref (zipfile.ZipFile): The opened EPUB archive
+        
+    Returns:
+        list: Paths of the content documents inside the archive
+    """
+    names = set(zip_ref.namelist())
+    content_paths = []
+    
+    for opf_path in get_opf_paths(zip_ref):
+        try:
+            root = ET.fromstring(zip_ref.read(opf_path))
+        except (KeyError, ET.ParseError) as e:
+            print(f"Error parsing OPF file: {e}")
+            continue
+        
+        # Map manifest ids to archive paths (hrefs are relative to the OPF file)
+        base_dir = posixpath.dirname(opf_path)
+        manifest = {}
+        for item in root.iter('{*}item'):
+            href = item.get('href')
+            if href and item.get('media-type') in CONTENT_MEDIA_TYPES:
+                path = posixpath.normpath(posixpath.join(base_dir, unquote(href.split('#')[0])))
+                manifest[item.get('id')] = path
+        
+        spine = [manifest[itemref.get('idref')] for itemref in root.iter('{*}itemref')
+                 if itemref.get('idref') in manifest]
+        content_paths.extend(spine or manifest.values())
+    
+    # If no content files found via OPF, use the HTML/XHTML files directly
+    if not content_paths:
+        content_paths = sorted(name for name in names if name.endswith(('.html', '.xhtml', '.htm')))
+    
+    # Drop dangling references and repeats while keeping reading order
+    return [path for path in dict.fromkeys(content_paths) if path in names]
+
+def iter_epub_documents(epub_path):
+    """Yield (path, raw bytes) for each chapter document of an EPUB in reading order"""
+    with zipfile.ZipFile(epub_path, 'r') as zip_ref:
+        for content_path in get_content_paths(zip_ref):
+            try:
+                with zip_ref.open(content_path) as f:
+                    content = f.read()
+            except Exception as e:
+                print(f"Error reading content file {content_path}: {e}")
+                continue
+            yield content_path, content
+
+def get_document_text(content):
+    """Get the visible text of a chapter document"""
+    return extract_text(content)
+
+def iter_epub_texts(epub_path):
+    """
+    Yield the text of each chapter of an EPUB in reading order
+    
+    Chapter documents are read one at a time straight from the archive, so
+    nothing is extracted to disk and only one chapter is held in memory.
+    """
+    for content_path, content in iter_epub_documents(epub_path):
+        try:
+            text = get_document_text(content)
+        except Exception as e:
+            print(f"Error processing content file {content_path}: {e}")
+            continue
+        yield text
+
+def _extract_document_words(content, counts=False):
+    """Extract the words, or word counts, of one chapter document (runs in a worker process)"""
+    try:
+        return extract_english_words(get_document_text(content), counts=counts)
+    except Exception as e:
+        print(f"Error processing content file: {e}")
+        return Counter() if counts else []
+
+def _get_pool(workers):
+    """
+    Get the shared chapter parsing pool with the given number of workers
+    
+    Pools are kept per size and never shut down, so a job thread asking for
+    another size cannot pull a pool from under one still mapping on it.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=_POOL_CONTEXT)
+        return pool
+
+def _map_bounded(pool, fn, items, window):
+    """
+    Map fn over items in a pool, yielding results in order
+    
+    At most window items are submitted but not yet consumed, so only that
+    many chapters are held in memory and in the pool's queue at a time.
+    """
+    pending = deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(pool.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
+
+def _report_progress(items, progress, total):
+    """Yield items, calling progress(done, total) after each one is consumed"""
+    for done, item in enumerate(items, 1):
+        yield item
+        progress(done, total)
 
-def parse_epub_file(epub_path):
-    """Parse an EPUB file and extract words"""
+def parse_epub_file(epub_path, workers=None, parallel_threshold=None, progress=None, counts=False):
+    """
+    Parse an EPUB file and extract words
+    
+    Chapters are tokenized one at a time. When more than one worker is
+    configured and the book has at least parallel_threshold chapters, chapter
+    documents are fanned out to a process pool and the per-chapter word lists
+    are merged. Chapters are read as the pool takes them, keeping at most two
+    per worker in flight.
+    
+    Args:
+        epub_path (str): Path to the EPUB file
+        workers (int): Worker processes to use, defaults to EPUB_POOL_SIZE
+        parallel_threshold (int): Minimum chapter count for parallel parsing,
+                                  defaults to EPUB_PARALLEL_THRESHOLD
+        progress (callable): Called as progress(chapters_done, chapter_count)
+                             after each chapter is tokenized
+        counts (bool): Return a Counter of occurrences instead of a list
+        
+    Returns:
+        list or Counter: Sorted unique lowercase words, or their counts
+    """
+    workers = EPUB_POOL_SIZE if workers is None else workers
+    if parallel_threshold is None:
+        parallel_threshold = EPUB_PARALLEL_THRESHOLD
+    
     try:
-        # Create a temporary directory to extract the EPUB contents
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Extract the EPUB file (which is just a ZIP archive)
+        chapter_count = None
+        if workers > 1 or progress:
             with zipfile.ZipFile(epub_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # Find the content files
-            all_text = ""
-            
-            # First, try to find content.opf
-            opf_files = []
-            for root, _, files in os.walk(temp_dir):
-                for file in files:
-                    if file.endswith('.opf'):
-                        opf_files.append(os.path.join(root, file))
-            
-            # If we found an OPF file, use it to locate the content files
-            content_files = []
-            if opf_files:
-                for opf_file in opf_files:
-                    try:
-                        tree = ET.parse(opf_file)
-                        root = tree.getroot()
-                        
-                        # Find the namespace
-                        ns = {'opf': root.tag.split('}')[0].strip('{')} if '}' in root.tag else {}
-                        
-                        # Find all items
-                        for item in root.findall('.//{{{0}}}item'.format(ns.get('opf', ''))):
-                            media_type = item.get('media-type')
-                            href = item.get('href')
-                            
-                            if (media_type and href and 
-                                (media_type == 'application/xhtml+xml' or 
-                                 media_type == 'text/html')):
-                                # Construct the full path to the content file
-                                content_path = os.path.join(os.path.dirname(opf_file), href)
-                                content_files.append(content_path)
-                    except Exception as e:
-                        print(f"Error parsing OPF file: {e}")
-            
-            # If no content files found via OPF, search for HTML/XHTML files directly
-            if not content_files:
-                for root, _, files in os.walk(temp_dir):
-                    for file in files:
-                        if file.endswith(('.html', '.xhtml', '.htm')):
-                            content_files.append(os.path.join(root, file))
-            
-            # Process all content files
-            for content_file in content_files:
-                try:
-                    with open(content_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    soup = BeautifulSoup(content, 'lxml')
-                    all_text += soup.get_text() + " "
-                except Exception as e:
-                    print(f"Error processing content file {content_file}: {e}")
-            
-            # Extract words
-            words = extract_english_words(all_text)
-            return words
+                chapter_count = len(get_content_paths(zip_ref))
+        
+        if workers > 1 and chapter_count >= parallel_threshold:
+            contents = (content for _, content in iter_epub_documents(epub_path))
+            results = _map_bounded(_get_pool(workers), partial(_extract_document_words, counts=counts),
+                                   contents, window=2 * workers)
+            if progress:
+                results = _report_progress(results, progress, chapter_count)
+            unique_words = Counter() if counts else set()
+            for words in results:
+                unique_words.update(words)
+            return unique_words if counts else sorted(unique_words)
+        
+        texts = iter_epub_texts(epub_path)
+        if progress:
+            texts = _report_progress(texts, progress, chapter_count)
+        return extract_english_words_from_texts(texts, counts=counts)
     except Exception as e:
         print(f"Error parsing EPUB file: {e}")
-        return []
+        return Counter() if counts else []
 
-def save_epub_file(uploaded_file):
-    """Save an uploaded EPUB file"""
+def save_epub_file(uploaded_file, epub_hash):
+    """
+    Save an uploaded EPUB file under its SHA-256
+    
+    Uploads are stored as <hash>.epub rather than under their own filename,
+    so a later upload that happens to share a name cannot replace the file
+    before its extraction job has read it. The file is written to a
+    temporary name and moved into place, so a job never sees it half written.
+    
+    Args:
+        uploaded_file: Uploaded file from the request
+        epub_hash (str): SHA-256 hex digest of the file
+        
+    Returns:
+        tuple: (saved path, uploaded filename), or (None, None) on failure
+    """
     try:
         filename = secure_filename(uploaded_file.filename)
-        file_path = os.path.join(EPUB_DIR, filename)
-        uploaded_file.save(file_path)
+        file_path = os.path.join(EPUB_DIR, f"{epub_hash}.epub")
+        fd, temp_path = tempfile.mkstemp(dir=EPUB_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                uploaded_file.save(f)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
         return file_path, filename
     except Exception as e:
         print(f"Error saving EPUB file: {e}")
@@ -109,3 +270,52 @@ def save_epub_words(epub_filename, words):
     except Exception as e:
         print(f"Error saving EPUB words: {e}")
         return None
+
+def get_upload_hash(uploaded_file):
+    """Get the SHA-256 hex digest of an uploaded file without consuming it"""
+    digest = hashlib.sha256()
+    stream = uploaded_file.stream
+    for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def get_cached_epub_words(epub_hash, counts=False):
+    """
+    Get the extraction result of an EPUB that was uploaded before
+    
+    Args:
+        epub_hash (str): SHA-256 hex digest of the EPUB file
+        counts (bool): Get the word counts instead of the word list
+        
+    Returns:
+        tuple: (words or Counter, attachment filename), or None if the file
+               has not been seen, its attachment has since been removed, or
+               counts were asked for but not recorded
+    """
+    entry = _epub_cache.get(epub_hash)
+    if not entry:
+        return None
+    if not os.path.exists(os.path.join(ATTACHMENT_DIR, entry['filename'])):
+        _epub_cache.delete(epub_hash)
+        return None
+    if counts:
+        return (Counter(entry['counts']), entry['filename']) if 'counts' in entry else None
+    return entry['words'], entry['filename']
+
+def cache_epub_words(epub_hash, words, filename):
+    """
+    Remember the extracted words and attachment filename for an EPUB file
+    
+    Args:
+        epub_hash (str): SHA-256 hex digest of the EPUB file
+        words (list or Counter): Sorted unique words, or their counts
+        filename (str): Attachment file the words were saved to
+    """
+    entry = {'filename': filename, 'words': sorted(words) if isinstance(words, Counter) else words}
+    if isinstance(words, Counter):
+        entry['counts'] = dict(words)
+    try:
+        _epub_cache.set(epub_hash, entry)
+    except Exception as e:
+        print(f"Error caching EPUB words: {e}")
@@ -0,0 +1,146 @@
+"""
+Crash-safe file writes with cross-process locking
+
+Books, done words and assessment results are shared by every worker process
+serving the app. Writers to one of those files hold an exclusive advisory
+lock on a sidecar <file>.lock, so read-modify-write cycles from different
+processes never interleave. Whole-file writes go to a temporary file that is
+fsynced and then moved over the original with os.replace, so a crash leaves
+either the old or the new contents, never a truncated file.
+
+fcntl is only available on POSIX systems. Elsewhere the locks still
+serialize threads within one process but not separate processes.
+"""
+
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive lock on a file shared by threads and processes
+
+    The lock is reentrant: a thread already holding it can acquire it again,
+    so a batch of writes can hold the lock while each write also takes it.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the lock
+
+        Args:
+            path (str): File to protect; the lock is taken on path + '.lock'
+        """
+        self.lock_path = f"{path}.lock"
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self):
+        """Block until this thread holds the lock"""
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                lock_file = open(self.lock_path, 'a')
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            except Exception:
+                self._thread_lock.release()
+                raise
+            self._file = lock_file
+        self._depth += 1
+
+    def release(self):
+        """Release one level of the lock"""
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class LockRegistry:
+    """One FileLock per path, so every writer in a process shares the same lock"""
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Get the lock for a file"""
+        path = os.path.abspath(path)
+        with self._lock:
+            lock = self._locks.get(path)
+            if lock is None:
+                lock = self._locks[path] = FileLock(path)
+            return lock
+
+
+# Locks shared by all writers in this process
+_locks = LockRegistry()
+
+
+def file_lock(path):
+    """
+    Get the process-wide lock for a file
+
+    Use it as a context manager around a read-modify-write cycle, e.g.
+    `with file_lock(path): ...`.
+    """
+    return _locks.get(path)
+
+
+def atomic_write(path, data, encoding='utf-8'):
+    """
+    Replace a file's contents so that readers and crashes never see a partial file
+
+    Args:
+        path (str): File to write
+        data (str or bytes): New contents
+        encoding (str): Encoding used when data is a str
+    """
+    if isinstance(data, str):
+        data = data.encode(encoding)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+def append_durable(path, data, encoding='utf-8'):
+    """
+    Append to a file in a single write and flush it to disk
+
+    Args:
+        path (str): File to append to, created if missing
+        data (str or bytes): Data to append
+        encoding (str): Encoding used when data is a str
+    """
+    if isinstance(data, str):
+        data = data.encode(encoding)
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
@@ -0,0 +1,184 @@
+"""
+HTML Text Extraction
+
+This module turns HTML and XHTML documents into plain text for tokenizing.
+Two backends are available:
+1. lxml - parses straight into an lxml tree and serializes its text in C
+2. bs4 - builds a BeautifulSoup tree and calls get_text (the original path)
+
+Both skip the content of <script>, <style> and <nav> elements, which is code
+or site chrome rather than readable text. The backend is chosen with the
+HTML_TEXT_BACKEND setting and lxml is the default.
+
+StreamingTextExtractor offers the same lxml extraction for documents that
+arrive in pieces, returning text as soon as it has been parsed.
+create_text_extractor picks it or, for the bs4 backend, an extractor that
+buffers the pieces and parses the whole document when it is closed.
+"""
+
+from lxml import etree
+from bs4 import BeautifulSoup
+from utils import HTML_TEXT_BACKEND
+
+# Elements whose content is not part of the readable text
+SKIPPED_TAGS = ('script', 'style', 'nav')
+
+def _extract_text_lxml(content):
+    """Get the readable text of an HTML document using lxml directly"""
+    if isinstance(content, str):
+        # lxml rejects str input that carries an encoding declaration
+        content = content.encode('utf-8')
+        encoding = 'utf-8'
+    else:
+        # lxml assumes Latin-1 for undeclared HTML, but EPUB documents and most
+        # of the web are UTF-8; only leave detection to lxml for other encodings
+        try:
+            content.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            encoding = None
+    
+    parser = etree.HTMLParser(encoding=encoding, remove_comments=True, remove_pis=True)
+    root = etree.fromstring(content, parser)
+    if root is None:
+        return ''
+    
+    etree.strip_elements(root, *SKIPPED_TAGS, with_tail=False)
+    return etree.tostring(root, method='text', encoding='unicode')
+
+def _extract_text_bs4(content):
+    """Get the readable text of an HTML document using BeautifulSoup"""
+    soup = BeautifulSoup(content, 'lxml')
+    for tag in soup(SKIPPED_TAGS):
+        tag.decompose()
+    return soup.get_text()
+
+TEXT_BACKENDS = {
+    'lxml': _extract_text_lxml,
+    'bs4': _extract_text_bs4
+}
+
+def extract_text(content, backend=None):
+    """
+    Get the readable text of an HTML or XHTML document
+    
+    Args:
+        content (str or bytes): The document; bytes are decoded using the
+                                document's own encoding declaration
+        backend (str): 'lxml' or 'bs4', defaults to HTML_TEXT_BACKEND
+        
+    Returns:
+        str: Text content without markup, scripts, styles or navigation
+    """
+    return TEXT_BACKENDS[backend or HTML_TEXT_BACKEND](content)
+
+class _TextTarget:
+    """lxml parser target that collects readable text as elements are parsed"""
+    
+    def __init__(self):
+        self.chunks = []
+        self._skip_depth = 0
+    
+    def start(self, tag, attrib):
+        if self._skip_depth or tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+    
+    def end(self, tag):
+        if self._skip_depth:
+            self._skip_depth -= 1
+    
+    def data(self, data):
+        if not self._skip_depth:
+            self.chunks.append(data)
+    
+    def close(self):
+        return None
+
+class StreamingTextExtractor:
+    """Incrementally extracts the readable text of an HTML document fed in pieces"""
+    
+    def __init__(self):
+        """Initialize the extractor with a fresh incremental lxml parser"""
+        self._target = _TextTarget()
+        self._parser = etree.HTMLParser(target=self._target, remove_comments=True, remove_pis=True)
+        self._pending = ''
+    
+    def _drain(self):
+        """Return and forget the text collected so far"""
+        text = ''.join(self._target.chunks)
+        self._target.chunks.clear()
+        return text
+    
+    def feed(self, data):
+        """
+        Parse the next piece of the document
+        
+        Args:
+            data (str): Decoded document text; may end in the middle of a tag
+            
+        Returns:
+            str: Readable text parsed from this piece, which may end mid-word
+        """
+        # libxml2's push parser loses the end of a <script> or <style> element
+        # when a piece ends inside its closing tag, so an unfinished tag is
+        # held back and fed together with the next piece
+        data = self._pending + data
+        tag_start = data.rfind('<')
+        if tag_start != -1 and data.find('>', tag_start) == -1:
+            data, self._pending = data[:tag_start], data[tag_start:]
+        else:
+            self._pending = ''
+        
+        if data:
+            self._parser.feed(data)
+        return self._drain()
+    
+    def close(self):
+        """Finish parsing and return any remaining text"""
+        try:
+            if self._pending:
+                self._parser.feed(self._pending)
+                self._pending = ''
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            pass  # Nothing was fed
+        return self._drain()
+
+class BufferedTextExtractor:
+    """Collects an HTML document fed in pieces and extracts its text when closed"""
+    
+    def __init__(self, backend=None):
+        """
+        Initialize the extractor
+        
+        Args:
+            backend (str): 'lxml' or 'bs4', defaults to HTML_TEXT_BACKEND
+        """
+        self.backend = backend
+        self._pieces = []
+    
+    def feed(self, data):
+        """Buffer the next piece of the document; no text is returned until close"""
+        self._pieces.append(data)
+        return ''
+    
+    def close(self):
+        """Parse the whole document and return its text"""
+        content = ''.join(self._pieces)
+        self._pieces = []
+        return extract_text(content, self.backend) if content else ''
+
+def create_text_extractor(backend=None):
+    """
+    Get an incremental text extractor for the configured backend
+    
+    Args:
+        backend (str): 'lxml' or 'bs4', defaults to HTML_TEXT_BACKEND
+        
+    Returns:
+        StreamingTextExtractor for lxml, or BufferedTextExtractor for bs4,
+        which holds the document until it is closed
+    """
+    if (backend or HTML_TEXT_BACKEND) == 'lxml':
+        return StreamingTextExtractor()
+    return BufferedTextExtractor(backend)
@@ -0,0 +1,155 @@
+"""
+Compressed, cacheable JSON responses
+
+Large word-list responses are compressed with brotli or gzip, whichever the
+client accepts (brotli only when the optional brotli package is installed),
+once they pass COMPRESS_MIN_BYTES.
+
+Endpoints whose payload only changes with some underlying data (a book, the
+done words, the vocabulary test word list) build it through PayloadCache.
+The serialized body, its content-hash ETag and each compressed encoding are
+computed once per data version and reused for every request until the
+version changes. A request whose If-None-Match matches a cached payload's
+ETag gets 304 without the payload being rebuilt.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import current_app, request
+from utils import COMPRESS_MIN_BYTES, COMPRESS_LEVEL
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Encodings we can produce, most preferred first
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def choose_encoding():
+    """Pick the best content encoding the current request accepts, or None"""
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    return encoding if encoding in ENCODINGS else None
+
+
+def compress(body, encoding):
+    """
+    Compress a response body
+
+    gzip output uses a fixed timestamp so the same body always compresses
+    to the same bytes.
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESS_LEVEL)
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+def _set_encoded_body(response, body, encoding):
+    """Replace a response body with its encoded form and mark it as such"""
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # A strong ETag names exact bytes; the compressed body is an equivalent variant
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response):
+    """
+    Compress a large JSON response if the client accepts it
+
+    Meant to run as an after_request hook; responses that are streamed,
+    already encoded, not JSON or below COMPRESS_MIN_BYTES pass through.
+    """
+    if (response.direct_passthrough or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype != 'application/json'):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = choose_encoding()
+    if encoding and len(body) >= COMPRESS_MIN_BYTES:
+        _set_encoded_body(response, compress(body, encoding), encoding)
+    return response
+
+
+class _Payload:
+    """A serialized JSON payload with its ETag and compressed encodings"""
+
+    __slots__ = ('body', 'etag', 'encoded')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.encoded = {}
+
+    def encode(self, encoding):
+        """Get the body in an encoding, compressing it on first use"""
+        data = self.encoded.get(encoding)
+        if data is None:
+            data = self.encoded[encoding] = compress(self.body, encoding)
+        return data
+
+
+class PayloadCache:
+    """Serialized payloads for a bounded number of keys, each valid for one data version"""
+
+    def __init__(self, max_entries=256):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries (int): Payloads kept before the least recently used is dropped
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def response(self, key, version, build):
+        """
+        Build a JSON response for a payload, reusing earlier work for the same version
+
+        Args:
+            key: Identifies the payload, e.g. the endpoint and its query
+            version: Changes whenever the data behind the payload changes
+            build (callable): Returns the payload dict when it is not cached
+
+        Returns:
+            Response: 304 if the client's If-None-Match holds the payload's
+                      ETag, otherwise the (possibly compressed) JSON body
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] == version:
+                self._entries.move_to_end(key)
+                payload = cached[1]
+            else:
+                payload = None
+
+        if payload is None:
+            payload = _Payload(current_app.json.dumps(build()).encode('utf-8') + b'\n')
+            with self._lock:
+                self._entries[key] = (version, payload)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        response = current_app.response_class(mimetype='application/json')
+        response.set_etag(payload.etag)
+        # Let clients keep the payload but revalidate it on every use
+        response.cache_control.no_cache = True
+        if request.if_none_match.contains_weak(payload.etag):
+            response.status_code = 304
+            response.vary.add('Accept-Encoding')
+            return response
+
+        response.set_data(payload.body)
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding()
+        if encoding and len(payload.body) >= COMPRESS_MIN_BYTES:
+            _set_encoded_body(response, payload.encode(encoding), encoding)
+        return response
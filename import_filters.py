@@ -0,0 +1,93 @@
+"""
+Import-time filtering of extracted words
+
+EPUB and webpage imports can drop words before they reach a book, so books
+only hold words worth studying. Every stage is off unless asked for:
+
+0. fold - fold regular inflections to their lemma ("habits" -> "habit"),
+   adding up their occurrences, before the other stages run
+1. min_count - drop words that occur fewer than this many times in the text
+2. common_rank - drop words whose COCA rank is at most this, e.g. 3000 skips
+   the 3,000 most common words
+3. vocab_size - drop the words a user most likely knows already, taking the
+   total_vocab_size estimate of the vocabulary count test as a rank cutoff
+
+Each stage is one dict lookup per word. Words already marked as done are
+skipped by add_words_to_book itself.
+"""
+
+from collections import Counter
+from word_ranks import get_rank_lookup
+from lemma_table import fold_inflections
+
+
+class ImportFilter:
+    """Filtering stages applied to extracted words before they are added to a book"""
+
+    def __init__(self, min_count=None, common_rank=None, vocab_size=None, fold=False):
+        """
+        Initialize the filter
+
+        Args:
+            min_count (int): Minimum number of occurrences in the text
+            common_rank (int): Skip words with a COCA rank up to this
+            vocab_size (int): Estimated vocabulary size; words ranked within it are skipped
+            fold (bool): Fold inflected forms to their lemma first
+        """
+        self.fold = fold
+        self.min_count = min_count or None
+        self.common_rank = common_rank or None
+        self.vocab_size = vocab_size or None
+
+    @property
+    def needs_counts(self):
+        """Whether the words must be extracted with their occurrence counts"""
+        return self.min_count is not None and self.min_count > 1
+
+    @property
+    def rank_cutoff(self):
+        """Highest COCA rank that is filtered out, or None"""
+        return max(self.common_rank or 0, self.vocab_size or 0) or None
+
+    def to_dict(self):
+        """Get the active stages and their settings"""
+        return {name: value for name, value in (('fold', self.fold),
+                                                ('min_count', self.min_count),
+                                                ('common_rank', self.common_rank),
+                                                ('vocab_size', self.vocab_size)) if value}
+
+    def apply(self, words):
+        """
+        Filter extracted words
+
+        Args:
+            words (list or Counter): Sorted unique words, or their counts
+                                     when needs_counts is set
+
+        Returns:
+            tuple: (sorted words that passed, dict of how many words each
+                    stage removed: 'rare_in_text' and 'too_common')
+        """
+        removed = {'rare_in_text': 0, 'too_common': 0}
+        if self.fold:
+            words = fold_inflections(words)
+        if isinstance(words, Counter):
+            counts = words
+            words = sorted(counts)
+            if self.needs_counts:
+                kept = [word for word in words if counts[word] >= self.min_count]
+                removed['rare_in_text'] = len(words) - len(kept)
+                words = kept
+
+        cutoff = self.rank_cutoff
+        if cutoff:
+            lookup = get_rank_lookup()
+            if lookup is None:
+                print("Error filtering by rank: COCA word list is not available")
+            else:
+                kept = [word for word, rank in zip(words, lookup.ranks(words))
+                        if rank is None or rank > cutoff]
+                removed['too_common'] = len(words) - len(kept)
+                words = kept
+
+        return words, removed
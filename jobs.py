@@ -0,0 +1,181 @@
+"""
+Background Job Queue
+
+Runs slow extraction work (EPUB parsing, webpage fetching) on an in-process
+worker pool so API requests can return a job id immediately instead of
+blocking a worker until parsing is done.
+
+Each job is recorded in a job table that is persisted to disk, one JSON file
+per job, whenever its state changes. Any process serving the app can then
+report a job's status, progress and result, and jobs left unfinished by a
+process that has exited are reported as failed.
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCESS = 'success'
+ERROR = 'error'
+FINISHED_STATES = (SUCCESS, ERROR)
+
+# Minimum seconds between progress writes to disk for one job
+PROGRESS_WRITE_INTERVAL = 0.5
+
+
+def _process_alive(pid):
+    """Check whether a process with the given id is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """Worker pool plus a disk-persisted table of the jobs it runs"""
+
+    def __init__(self, directory, workers, retention):
+        """
+        Initialize the job queue
+
+        Args:
+            directory (str): Directory holding one <job_id>.json file per job
+            workers (int): Number of worker threads
+            retention (float): Seconds finished jobs are kept before pruning
+        """
+        self.directory = directory
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._last_write = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id):
+        """Get the file path of a job record"""
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _write(self, job):
+        """Persist a job record atomically"""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(job, f)
+            os.replace(temp_path, self._path(job['id']))
+        except Exception as e:
+            os.remove(temp_path)
+            print(f"Error saving job {job['id']}: {e}")
+
+    def _update(self, job_id, force=True, **changes):
+        """Apply changes to a job record and persist it"""
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(changes)
+            job['updated_at'] = time.time()
+
+            now = time.monotonic()
+            if not force and now - self._last_write.get(job_id, 0) < PROGRESS_WRITE_INTERVAL:
+                return
+            self._last_write[job_id] = now
+            snapshot = dict(job)
+
+            if job['status'] in FINISHED_STATES:
+                # Finished jobs are served from disk like any other process's
+                del self._jobs[job_id]
+                self._last_write.pop(job_id, None)
+        self._write(snapshot)
+
+    def submit(self, job_type, func, *args, progress_unit=None):
+        """
+        Queue a function to run in the background
+
+        The function is called as func(*args, progress=callback) and must return
+        a (payload, http_status) tuple. The callback takes (done, total) and
+        records the job's progress in progress_unit (e.g. 'chapters', 'bytes').
+
+        Returns:
+            str: The new job's id
+        """
+        self.prune()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {
+            'id': job_id,
+            'type': job_type,
+            'status': QUEUED,
+            'progress': {'done': 0, 'total': None, 'unit': progress_unit},
+            'result': None,
+            'http_status': None,
+            'pid': os.getpid(),
+            'created_at': now,
+            'updated_at': now
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+        self._write(dict(job))
+        self._executor.submit(self._run, job_id, func, args, progress_unit)
+        return job_id
+
+    def _run(self, job_id, func, args, progress_unit):
+        """Run a job on a worker thread and record its outcome"""
+        self._update(job_id, status=RUNNING)
+
+        def progress(done, total=None):
+            self._update(job_id, force=False,
+                         progress={'done': done, 'total': total, 'unit': progress_unit})
+
+        try:
+            payload, http_status = func(*args, progress=progress)
+        except Exception as e:
+            print(f"Error running job {job_id}: {e}")
+            payload, http_status = {'status': 'error', 'message': str(e)}, 500
+
+        self._update(job_id, status=SUCCESS if http_status < 400 else ERROR,
+                     result=payload, http_status=http_status)
+
+    def get(self, job_id):
+        """
+        Get the current record of a job
+
+        Returns:
+            dict: The job record, or None if there is no such job
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        # A job that never finished in a process that has exited will never finish
+        if job['status'] not in FINISHED_STATES and not _process_alive(job['pid']):
+            job['status'] = ERROR
+            job['http_status'] = 500
+            job['result'] = {'status': 'error', 'message': 'Job was interrupted'}
+        return job
+
+    def prune(self):
+        """Remove records of finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Inflection folding with a precomputed, memory-mapped lemma table
+
+The COCA list holds lemmas ("habit", "make", "study") plus the inflected
+forms that are words in their own right ("making", "evening", "news"). The
+lemma table is generated from it offline by applying the regular English
+inflection rules to every entry:
+
+    plural / 3rd person   habit -> habits, box -> boxes, cry -> cries
+    past                  walk -> walked, visit -> visited, grab -> grabbed
+    present participle    hope -> hoping, step -> stepping, vie -> vying
+
+Final consonants are doubled only in one-syllable words (step -> stepping,
+but visit -> visiting), and function words ("for", "not", "than") are not
+inflected. Only generated forms that are not COCA entries themselves are
+kept, so folding never merges two listed words. A form generated from two
+lemmas goes to the silent-e one ("stared" is "stare", not "star"), otherwise
+to the most frequent. The rules are heuristic: a form that is really an
+inflection of an unlisted word can still fold to the wrong lemma, and
+irregular forms ("went", "children") are left alone.
+
+File layout (all integers little-endian uint32):
+
+    header        magic b'LEMMAID1', form_count, table_size
+    offsets       form_count + 1 entries: form i is table[offsets[i]:offsets[i + 1]]
+    lemma_ranks   form_count entries: COCA rank of each form's lemma
+    table         the forms sorted by their UTF-8 bytes, concatenated
+
+The table is built next to its word list (<list>.lemmas) the first time it is
+needed and rebuilt when the list is newer, or ahead of time with:
+
+    python3 lemma_table.py build [data/COCA60000.txt]
+"""
+
+import os
+import mmap
+import struct
+import argparse
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from file_io import file_lock, atomic_write
+from coca_index import open_index
+
+MAGIC = b'LEMMAID1'
+_HEADER = struct.Struct('<8sII')
+_VOWELS = 'aeiou'
+# Closed-class words that have no inflections of their own
+_FUNCTION_WORDS = frozenset('''
+    about above across after against along among and any around before behind
+    below beneath beside between beyond both but can could did does down during
+    each either for from had has have her him his how into its may might mine
+    more most much must near neither nor not off onto our ours out over own per
+    shall she should since than that the their them then there these they this
+    those though through till too toward under unless until upon very was were
+    what when where which while who whom whose why will with within without
+    would yet you your yours
+'''.split())
+# Every generated form ends in one of these
+_SUFFIXES = ('s', 'ed', 'ing')
+
+# Shared table over the COCA60000 list, opened on first use
+_lemma_table = None
+
+
+def lemma_table_path(list_path):
+    """Get the path of the lemma table generated from a word list"""
+    return os.path.splitext(list_path)[0] + '.lemmas'
+
+
+def inflect(lemma):
+    """
+    Generate the regular inflected forms of a word
+
+    The final consonant is doubled before -ed/-ing only in one-syllable
+    words ending consonant-vowel-consonant (stop -> stopped); longer words
+    keep the plain spelling (visit -> visited). The plain spelling of a
+    one-syllable word would be the form of its silent-e twin (star ->
+    "stared"), so it is never produced.
+
+    Returns:
+        list: Inflected forms; empty for words the rules do not apply to
+    """
+    if len(lemma) < 3 or not (lemma.isascii() and lemma.isalpha()) or lemma in _FUNCTION_WORDS:
+        return []
+    last = lemma[-1]
+    consonant_y = last == 'y' and lemma[-2] not in _VOWELS
+    syllables = sum(1 for i, c in enumerate(lemma) if c in _VOWELS and (i == 0 or lemma[i - 1] not in _VOWELS))
+    # One-syllable consonant-vowel-consonant endings double before -ed/-ing
+    doubles = (syllables == 1 and last not in _VOWELS + 'wxy'
+               and lemma[-2] in _VOWELS and lemma[-3] not in _VOWELS)
+
+    if consonant_y:
+        forms = [lemma[:-1] + 'ies', lemma[:-1] + 'ied']
+    elif lemma.endswith(('s', 'x', 'z', 'ch', 'sh', 'o')):
+        forms = [lemma + 'es']
+    else:
+        forms = [lemma + 's']
+
+    if last == 'e':
+        forms.append(lemma + 'd')
+    elif doubles:
+        forms.append(lemma + last + 'ed')
+    elif not consonant_y:
+        forms.append(lemma + 'ed')
+
+    if lemma.endswith('ie'):
+        forms.append(lemma[:-2] + 'ying')
+    elif last == 'e' and not lemma.endswith(('ee', 'ye', 'oe')):
+        forms.append(lemma[:-1] + 'ing')
+    elif doubles:
+        forms.append(lemma + last + 'ing')
+    else:
+        forms.append(lemma + 'ing')
+    return forms
+
+
+def build_lemma_table(list_path, output_path=None):
+    """
+    Generate the lemma table of a COCA word list
+
+    Args:
+        list_path (str): Word list, one word per line in rank order
+        output_path (str): Where to write the table, defaults to lemma_table_path(list_path)
+
+    Returns:
+        str: Path of the written table
+    """
+    output_path = output_path or lemma_table_path(list_path)
+    ranked = list(open_index(list_path).iter_ranked())
+    listed = {word for _, word in ranked}
+
+    lemmas = {}
+    for rank, lemma in ranked:
+        for form in inflect(lemma):
+            if form in listed:
+                # Listed words are never folded
+                continue
+            # The silent-e lemma wins ("stared" is "stare"), then the most frequent
+            current = lemmas.get(form)
+            if current is None or current[1] + 'e' == lemma:
+                lemmas[form] = (rank, lemma)
+    lemma_ranks = {form: rank for form, (rank, _) in lemmas.items()}
+
+    forms = sorted(lemma_ranks, key=lambda form: form.encode('utf-8'))
+    offsets = array('I', [0])
+    table = bytearray()
+    for form in forms:
+        table += form.encode('utf-8')
+        offsets.append(len(table))
+    ranks = array('I', (lemma_ranks[form] for form in forms))
+    if struct.pack('=I', 1) != struct.pack('<I', 1):
+        offsets.byteswap()
+        ranks.byteswap()
+
+    header = _HEADER.pack(MAGIC, len(forms), len(table))
+    atomic_write(output_path, header + offsets.tobytes() + ranks.tobytes() + bytes(table))
+    return output_path
+
+
+class _Forms:
+    """Sequence view of the sorted forms, for bisect"""
+
+    def __init__(self, table):
+        self._table = table
+
+    def __len__(self):
+        return self._table.form_count
+
+    def __getitem__(self, i):
+        return self._table._form_bytes(i)
+
+
+class LemmaTable:
+    """Read-only view of a generated lemma table"""
+
+    def __init__(self, path, index):
+        """
+        Map a lemma table into memory
+
+        Args:
+            path (str): Path of a file written by build_lemma_table
+            index (CocaIndex): Index of the word list the table was built from
+
+        Raises:
+            ValueError: If the file is not a lemma table
+        """
+        self.index = index
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.form_count, table_size = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a lemma table")
+
+        view = memoryview(self._map)
+        offsets_start = _HEADER.size
+        ranks_start = offsets_start + 4 * (self.form_count + 1)
+        self._table_start = ranks_start + 4 * self.form_count
+        self._offsets = view[offsets_start:ranks_start].cast('I')
+        self._lemma_ranks = view[ranks_start:self._table_start].cast('I')
+        self._forms = _Forms(self)
+
+    def __len__(self):
+        """Number of inflected forms in the table"""
+        return self.form_count
+
+    def _form_bytes(self, i):
+        """Get the UTF-8 bytes of the i-th form"""
+        return self._map[self._table_start + self._offsets[i]:self._table_start + self._offsets[i + 1]]
+
+    def lemma_of(self, word):
+        """
+        Get the lemma of an inflected form
+
+        Returns:
+            str: The lemma, or None if the word is not a known inflected form
+        """
+        if not word.endswith(_SUFFIXES):
+            return None
+        target = word.encode('utf-8')
+        i = bisect_left(self._forms, target)
+        if i < self.form_count and self._form_bytes(i) == target:
+            return self.index.word_at(self._lemma_ranks[i])
+        return None
+
+    def fold(self, word):
+        """Get the lemma of a word, or the word itself if it is not an inflected form"""
+        return self.lemma_of(word) or word
+
+    def fold_words(self, words):
+        """
+        Fold a list of words
+
+        Returns:
+            list: The folded word for each word, in input order
+        """
+        folded = {}
+        result = []
+        for word in words:
+            lemma = folded.get(word)
+            if lemma is None:
+                lemma = folded[word] = self.fold(word)
+            result.append(lemma)
+        return result
+
+    def fold_counts(self, counts):
+        """
+        Fold a Counter of words, adding up the counts of forms with the same lemma
+
+        Returns:
+            Counter: Occurrences per folded word
+        """
+        folded = Counter()
+        for word, count in counts.items():
+            folded[self.fold(word)] += count
+        return folded
+
+
+def open_lemma_table(list_path, index=None):
+    """
+    Open the lemma table of a word list, building it first if it is missing or stale
+
+    Args:
+        list_path (str): COCA word list
+        index (CocaIndex): Already opened index of the list, opened if not given
+
+    Returns:
+        LemmaTable: The mapped table, or None if the word list does not exist
+    """
+    index = index or open_index(list_path)
+    if index is None:
+        return None
+    path = lemma_table_path(list_path)
+    with file_lock(path):
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(list_path):
+            build_lemma_table(list_path, path)
+    return LemmaTable(path, index)
+
+
+def get_lemma_table():
+    """
+    Get the process-wide lemma table of the COCA60000 list
+
+    Returns:
+        LemmaTable: The table, or None if it cannot be loaded
+    """
+    global _lemma_table
+
+    if _lemma_table is None:
+        # Imported here because vocab_count_test imports utils, which folds through this module
+        from vocab_count_test import COCA_FILE, get_coca_index
+        try:
+            _lemma_table = open_lemma_table(COCA_FILE, get_coca_index())
+        except Exception as e:
+            print(f"Error opening lemma table: {e}")
+
+    return _lemma_table
+
+
+def fold_inflections(words):
+    """
+    Fold extracted words to their lemmas with the shared lemma table
+
+    Args:
+        words (list or Counter): Sorted unique words, or their counts
+
+    Returns:
+        list or Counter: Sorted unique folded words, or the folded counts;
+                         the words unchanged if the table cannot be loaded
+    """
+    table = get_lemma_table()
+    if table is None:
+        return words
+    if isinstance(words, Counter):
+        return table.fold_counts(words)
+    return sorted(set(table.fold_words(words)))
+
+
+if __name__ == '__main__':
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+    parser = argparse.ArgumentParser(description='Generate lemma tables from COCA word lists')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='Build the lemma table of each word list')
+    build_parser.add_argument('lists', nargs='*', default=[os.path.join(data_dir, 'COCA60000.txt')],
+                              help='Word lists to use (default: the bundled COCA60000 list)')
+    args = parser.parse_args()
+
+    for list_path in args.lists:
+        path = build_lemma_table(list_path)
+        print(f"Built {path} ({os.path.getsize(path)} bytes, from {list_path})")
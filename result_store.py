@@ -0,0 +1,63 @@
+"""
+File-based store for assessment results
+
+Each user's results are kept in <user_id>.json in the results directory as
+{"results": [...]}, oldest first. This is the default backend; see
+sqlite_store.SQLiteResultStore for the database-backed one.
+
+Writes hold the results file's lock and replace it atomically, so results
+saved by concurrent worker processes are never lost or truncated.
+"""
+
+import os
+import json
+from file_io import file_lock, atomic_write
+
+
+class JsonResultStore:
+    """Assessment results stored as one JSON file per user"""
+
+    def __init__(self, directory):
+        """
+        Initialize the result store
+
+        Args:
+            directory (str): Directory holding the <user_id>.json files
+        """
+        self.directory = directory
+
+    def _user_file(self, user_id):
+        """Get the path of a user's results file"""
+        return os.path.join(self.directory, f'{user_id}.json')
+
+    def list_users(self):
+        """Get the ids of all users with a results file"""
+        if not os.path.isdir(self.directory):
+            return []
+        return [file[:-5] for file in os.listdir(self.directory) if file.endswith('.json')]
+
+    def get_results(self, user_id):
+        """
+        Get a user's assessment results, oldest first
+
+        Returns:
+            list: The user's results, empty if there are none
+        """
+        user_file = self._user_file(user_id)
+        if not os.path.exists(user_file):
+            return []
+        with open(user_file, 'r') as f:
+            return json.load(f).get('results', [])
+
+    def replace_results(self, user_id, results):
+        """Replace all of a user's assessment results"""
+        os.makedirs(self.directory, exist_ok=True)
+        user_file = self._user_file(user_id)
+        with file_lock(user_file):
+            atomic_write(user_file, json.dumps({'results': results}))
+
+    def add_result(self, user_id, result):
+        """Record an assessment result for a user"""
+        os.makedirs(self.directory, exist_ok=True)
+        with file_lock(self._user_file(user_id)):
+            self.replace_results(user_id, self.get_results(user_id) + [result])
@@ -1,14 +1,20 @@
-from flask import Blueprint, request, jsonify, render_template, send_from_directory, session
+from flask import Blueprint, request, jsonify, render_template, send_from_directory, session, url_for
 import os
 import uuid
-from utils import allowed_file, get_app_dirs
-from book_manager import (get_all_books, get_words_from_book, 
+from utils import allowed_file, get_app_dirs, MAX_URLS_PER_REQUEST, JOB_WORKERS, JOB_RETENTION
+from book_manager import (get_all_books, get_words_from_book, get_book_page, get_book_version,
                         add_word_to_book, add_words_to_book, 
-                        create_book, book_exists, mark_word_as_done, get_done_words)
-from web_extractor import extract_words_from_webpage, save_webpage_words
-from epub_processor import parse_epub_file, save_epub_file, save_epub_words
+                        create_book, book_exists, mark_word_as_done, mark_words_as_done,
+                        get_done_words, get_done_version)
+from web_extractor import extract_words_from_webpage, extract_words_from_webpages, save_webpage_words
+from epub_processor import (parse_epub_file, save_epub_file, save_epub_words,
+                            get_upload_hash, get_cached_epub_words, cache_epub_words)
+from jobs import JobQueue
+from http_cache import PayloadCache, compress_response
 from vocab_assessment import VocabularyAssessment, generate_adaptive_test, get_next_adaptive_question
-from vocab_count_test import get_test_words, calculate_vocab_size
+from vocab_count_test import get_test_words, calculate_vocab_size, NUM_BANDS
+from word_ranks import get_rank_lookup, sort_ranked, count_bands, SORT_KEYS
+from import_filters import ImportFilter
 
 # Get directory paths
 DIRS = get_app_dirs()
@@ -16,9 +22,20 @@ VOCAB_DIR = DIRS['VOCAB_DIR']
 ATTACHMENT_DIR = DIRS['ATTACHMENT_DIR']
 EPUB_DIR = DIRS['EPUB_DIR']
 
+# Background extraction jobs
+_jobs = JobQueue(DIRS['JOBS_DIR'], JOB_WORKERS, JOB_RETENTION)
+
 # Create a Blueprint for API routes
 bp = Blueprint('vocabulary', __name__)
 
+# Serialized word-list payloads, reused until their data changes
+_payloads = PayloadCache()
+
+@bp.after_request
+def compress(response):
+    """Compress large JSON responses for clients that accept it"""
+    return compress_response(response)
+
 # Web routes
 @bp.route('/')
 def index():
@@ -70,14 +87,50 @@ def create_new_book():
 
 @bp.route('/api/books/<book_name>', methods=['GET'])
 def get_book(book_name):
-    """API endpoint to get words from a vocabulary book"""
-    words = get_words_from_book(book_name)
-    return jsonify({
-        'status': 'success',
-        'book_name': book_name,
-        'word_count': len(words),
-        'words': words
-    })
+    """
+    API endpoint to get words from a vocabulary book
+    
+    Query parameters (all optional):
+        offset, limit: Return a page of the words; next_offset gives the next page
+        prefix: Only return words starting with this prefix
+        fields=count: Return only the word count
+    
+    The response carries a content-hash ETag. Payloads are cached per
+    version of the book, so a request whose If-None-Match matches gets 304
+    without the words being read again.
+    """
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', type=int)
+    if offset < 0 or (limit is not None and limit < 0):
+        return jsonify({
+            'status': 'error',
+            'message': 'Offset and limit must be non-negative integers'
+        }), 400
+    prefix = request.args.get('prefix', '').strip().lower() or None
+    count_only = request.args.get('fields') == 'count'
+    
+    def build():
+        words, total = get_book_page(book_name, offset, 0 if count_only else limit, prefix)
+        if count_only:
+            return {
+                'status': 'success',
+                'book_name': book_name,
+                'word_count': total
+            }
+        end = offset + len(words)
+        return {
+            'status': 'success',
+            'book_name': book_name,
+            'word_count': total,
+            'words': words,
+            'offset': offset,
+            'next_offset': end if end < total else None
+        }
+    
+    version = get_book_version(book_name)
+    if version is None:
+        return jsonify(build())
+    return _payloads.response(('book', book_name, offset, limit, prefix, count_only), version, build)
 
 @bp.route('/api/books/<book_name>/words', methods=['POST'])
 def add_word(book_name):
@@ -124,53 +177,227 @@ def add_words_batch(book_name):
             'message': f'Book "{book_name}" does not exist'
         }), 404
     
-    word_count = add_words_to_book(book_name, words)
+    result = add_words_to_book(book_name, words, fold=bool(data.get('fold')))
     return jsonify({
         'status': 'success',
-        'message': f'{word_count} new words added to "{book_name}" successfully'
+        'message': f'{result["added"]} new words added to "{book_name}" successfully',
+        'added_count': result['added'],
+        'duplicate_count': result['duplicates'],
+        'already_done_count': result['already_done']
     })
 
-# API endpoints for web content extraction
-@bp.route('/api/extract-webpage', methods=['POST'])
-def extract_webpage():
-    """API endpoint to extract words from a webpage"""
-    print("extract_webpage called")
-    data = request.form
-    print(f"Request form data: {data}")
-    if not data or 'url' not in data:
-        print("URL is missing in the request")
+def _rank_order_args(default_sort):
+    """
+    Read the sort and order query parameters of the rank endpoints
+    
+    Returns:
+        tuple: (sort, reverse, error_response); error_response is None when valid
+    """
+    sort = request.args.get('sort', default_sort)
+    order = request.args.get('order', 'asc')
+    if sort not in SORT_KEYS or order not in ('asc', 'desc'):
+        return None, None, (jsonify({
+            'status': 'error',
+            'message': f'sort must be one of {", ".join(SORT_KEYS)} and order must be asc or desc'
+        }), 400)
+    return sort, order == 'desc', None
+
+def _rank_lookup_unavailable():
+    """Response for when the COCA word list cannot be loaded"""
+    return jsonify({
+        'status': 'error',
+        'message': 'COCA word list is not available'
+    }), 503
+
+@bp.route('/api/books/<book_name>/ranks', methods=['GET'])
+def get_book_ranks(book_name):
+    """
+    API endpoint to get the words of a vocabulary book with their COCA rank and band
+    
+    Query parameters (all optional):
+        sort: rank (default, most common first), band (grouped by band, book
+              order within a band) or book (book order)
+        order: asc (default) or desc
+        band: Only return words in this band (1-10)
+    """
+    sort, reverse, error = _rank_order_args('rank')
+    if error:
+        return error
+    band = request.args.get('band', type=int)
+    if 'band' in request.args and not (band and 1 <= band <= NUM_BANDS):
         return jsonify({
             'status': 'error',
-            'message': 'URL is required'
+            'message': f'Band must be between 1 and {NUM_BANDS}'
         }), 400
     
-    url = data['url']
-    print(f"Extracting words from URL: {url}")
-    words = extract_words_from_webpage(url)
+    version = get_book_version(book_name)
+    if version is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Book "{book_name}" does not exist'
+        }), 404
+    lookup = get_rank_lookup()
+    if lookup is None:
+        return _rank_lookup_unavailable()
+    
+    def build():
+        entries = lookup.annotate(get_words_from_book(book_name))
+        summary = count_bands(entries)
+        if band:
+            entries = [entry for entry in entries if entry['band'] == band]
+        return {
+            'status': 'success',
+            'book_name': book_name,
+            'word_count': len(entries),
+            'words': sort_ranked(entries, sort, reverse),
+            'band_counts': summary['bands'],
+            'unranked_count': summary['unranked']
+        }
+    
+    return _payloads.response(('book_ranks', book_name, sort, reverse, band), version, build)
+
+# API endpoints for web content extraction
+def _wants_sync():
+    """Check whether the client asked for a job to run inside the request"""
+    return request.values.get('sync', '').lower() in ('1', 'true', 'yes')
+
+def _dispatch(job_type, progress_unit, func, *args):
+    """
+    Run an extraction function in the background job queue, or inline if requested
+    
+    func is called with *args and a progress keyword and returns a
+    (payload, status code) tuple. By default the request returns 202 with the
+    job id straight away; with sync=1 the function runs in the request and its
+    payload is returned directly.
+    """
+    if _wants_sync():
+        payload, code = func(*args, progress=None)
+        return jsonify(payload), code
+    
+    job_id = _jobs.submit(job_type, func, *args, progress_unit=progress_unit)
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job_id,
+        'status_url': url_for('vocabulary.get_job', job_id=job_id)
+    }), 202
+
+def _extract_webpage_words(url, target_words, progress=None, counts=False):
+    """
+    Extract words from a webpage and save them to the attachment folder
+    
+    Returns:
+        tuple: (words, or a Counter of them if counts is set, attachment
+               filename, None) on success, or
+               (None, None, (error payload, status code)) on failure
+    """
+    words = extract_words_from_webpage(url, target_words=target_words, progress=progress, counts=counts)
     print(f"Extracted {len(words)} words")
     
     if not words:
-        return jsonify({
+        return None, None, ({
             'status': 'error',
             'message': 'No words could be extracted from the webpage'
-        }), 400
+        }, 400)
     
     # Save words to a file
-    filename = save_webpage_words(url, words)
+    filename = save_webpage_words(url, sorted(words) if counts else words)
     
     if filename is None:
-        return jsonify({
+        return None, None, ({
             'status': 'error',
             'message': 'Error saving extracted words to file'
-        }), 500
+        }, 500)
     
-    return jsonify({
+    return words, filename, None
+
+def _run_extract_webpage(url, target_words, progress=None):
+    """Job body for /api/extract-webpage"""
+    words, filename, error = _extract_webpage_words(url, target_words, progress)
+    if error:
+        return error
+    
+    return {
         'status': 'success',
         'message': f'{len(words)} words extracted and saved to "{filename}"',
         'filename': filename,
         'word_count': len(words),
         'words': words[:20] if len(words) > 20 else words  # Send only the first 20 words
-    })
+    }, 200
+
+def _read_import_filter():
+    """
+    Read the optional import filter fields of a to-book request
+    
+    Returns:
+        tuple: (ImportFilter, None), or (None, error response) for an invalid value
+    """
+    values = {}
+    for name in ('min_count', 'common_rank', 'vocab_size'):
+        value = request.form.get(name, type=int)
+        if request.form.get(name, '') != '' and (value is None or value < 0):
+            return None, (jsonify({
+                'status': 'error',
+                'message': f'{name} must be a non-negative integer'
+            }), 400)
+        values[name] = value
+    fold = request.form.get('fold', '').lower() in ('1', 'true', 'yes')
+    return ImportFilter(fold=fold, **values), None
+
+def _add_extracted_words(book_name, words, filename, import_filter):
+    """
+    Filter extracted words and add the rest to a vocabulary book
+    
+    Returns:
+        tuple: (job result payload, status code)
+    """
+    extracted_count = len(words)
+    words, removed = import_filter.apply(words)
+    
+    # Add words to the vocabulary book, folding done words like the extracted ones
+    result = add_words_to_book(book_name, words, fold=import_filter.fold)
+    
+    message = f'{extracted_count} words extracted'
+    if import_filter.to_dict():
+        message += f', {extracted_count - len(words)} filtered out'
+    return {
+        'status': 'success',
+        'message': f'{message}, {result["added"]} new words added to "{book_name}"',
+        'filename': filename,
+        'word_count': extracted_count,
+        'new_word_count': result['added'],
+        'duplicate_count': result['duplicates'],
+        'already_done_count': result['already_done'],
+        'filters': import_filter.to_dict(),
+        'filtered_count': removed,
+        'words': words[:20] if len(words) > 20 else words  # Send only the first 20 words
+    }, 200
+
+def _run_extract_to_book(url, book_name, target_words, import_filter, progress=None):
+    """Job body for /api/extract-to-book"""
+    words, filename, error = _extract_webpage_words(url, target_words, progress, import_filter.needs_counts)
+    if error:
+        return error
+    
+    return _add_extracted_words(book_name, words, filename, import_filter)
+
+@bp.route('/api/extract-webpage', methods=['POST'])
+def extract_webpage():
+    """API endpoint to extract words from a webpage"""
+    print("extract_webpage called")
+    data = request.form
+    print(f"Request form data: {data}")
+    if not data or 'url' not in data:
+        print("URL is missing in the request")
+        return jsonify({
+            'status': 'error',
+            'message': 'URL is required'
+        }), 400
+    
+    url = data['url']
+    # Optionally stop reading the page once this many unique words are found
+    target_words = data.get('target_words', type=int)
+    print(f"Extracting words from URL: {url}")
+    return _dispatch('extract-webpage', 'bytes', _run_extract_webpage, url, target_words)
 
 @bp.route('/api/extract-to-book', methods=['POST'])
 def extract_to_book():
@@ -191,16 +418,56 @@ def extract_to_book():
             'message': f'Book "{book_name}" does not exist'
         }), 404
     
-    words = extract_words_from_webpage(url)
+    import_filter, error = _read_import_filter()
+    if error:
+        return error
+    
+    return _dispatch('extract-to-book', 'bytes', _run_extract_to_book,
+                     url, book_name, data.get('target_words', type=int), import_filter)
+
+@bp.route('/api/extract-webpages', methods=['POST'])
+def extract_webpages():
+    """API endpoint to extract words from several webpages concurrently, optionally adding them to a book"""
+    data = request.get_json()
+    if not data or not isinstance(data.get('urls'), list) or not data['urls']:
+        return jsonify({
+            'status': 'error',
+            'message': 'A list of URLs is required'
+        }), 400
+    
+    urls = data['urls']
+    if len(urls) > MAX_URLS_PER_REQUEST:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {MAX_URLS_PER_REQUEST} URLs can be extracted at once'
+        }), 400
+    
+    target_words = data.get('target_words')
+    if target_words is not None and not isinstance(target_words, int):
+        return jsonify({
+            'status': 'error',
+            'message': 'target_words must be an integer'
+        }), 400
+    
+    book_name = data.get('book_name')
+    if book_name and not book_exists(book_name):
+        return jsonify({
+            'status': 'error',
+            'message': f'Book "{book_name}" does not exist'
+        }), 404
+    
+    extraction = extract_words_from_webpages(urls, target_words=target_words)
+    words = extraction['words']
     
     if not words:
         return jsonify({
             'status': 'error',
-            'message': 'No words could be extracted from the webpage'
+            'message': 'No words could be extracted from the webpages',
+            'results': extraction['results']
         }), 400
     
-    # Save words to a file
-    filename = save_webpage_words(url, words)
+    # Save the merged words to a single file
+    filename = save_webpage_words(urls[0], words, base_name='reading_list')
     
     if filename is None:
         return jsonify({
@@ -208,19 +475,122 @@ def extract_to_book():
             'message': 'Error saving extracted words to file'
         }), 500
     
-    # Add words to the vocabulary book
-    word_count = add_words_to_book(book_name, words)
-    
-    return jsonify({
+    response = {
         'status': 'success',
-        'message': f'{len(words)} words extracted, {word_count} new words added to "{book_name}"',
+        'message': f'{len(words)} words extracted from {len(extraction["results"])} webpages and saved to "{filename}"',
         'filename': filename,
         'word_count': len(words),
-        'new_word_count': word_count,
+        'results': extraction['results'],
         'words': words[:20] if len(words) > 20 else words  # Send only the first 20 words
-    })
+    }
+    
+    # Add words to the vocabulary book if one was given
+    if book_name:
+        result = add_words_to_book(book_name, words)
+        response['message'] += f', {result["added"]} new words added to "{book_name}"'
+        response['new_word_count'] = result['added']
+        response['duplicate_count'] = result['duplicates']
+        response['already_done_count'] = result['already_done']
+    
+    return jsonify(response)
 
 # API endpoints for EPUB processing
+def _save_epub_upload(file, counts=False):
+    """
+    Hash an uploaded EPUB and save it to the EPUB folder
+    
+    This runs inside the request because the upload stream is gone once the
+    request ends. A file whose SHA-256 matches an earlier upload is not saved
+    again, since its words (and their counts, if counts is set) are already
+    cached.
+    
+    Returns:
+        tuple: (hash, EPUB path, EPUB filename, None) on success, with a None
+               path and filename for a cached upload, or
+               (None, None, None, error response) on failure
+    """
+    epub_hash = get_upload_hash(file)
+    if get_cached_epub_words(epub_hash, counts):
+        return epub_hash, None, None, None
+    
+    # Save the uploaded file
+    epub_path, epub_filename = save_epub_file(file, epub_hash)
+    
+    if not epub_path or not epub_filename:
+        return None, None, None, (jsonify({
+            'status': 'error',
+            'message': 'Error saving the uploaded file'
+        }), 500)
+    
+    return epub_hash, epub_path, epub_filename, None
+
+def _extract_epub_words(epub_hash, epub_path, epub_filename, progress=None, counts=False):
+    """
+    Extract the words of a saved EPUB and save them to the attachment folder
+    
+    Cached words for the same file are reused without parsing.
+    
+    Returns:
+        tuple: (words, or a Counter of them if counts is set, attachment
+               filename, None) on success, or
+               (None, None, (error payload, status code)) on failure
+    """
+    cached = get_cached_epub_words(epub_hash, counts)
+    if cached:
+        words, filename = cached
+        return words, filename, None
+    
+    if epub_path is None:
+        # The cache entry was evicted after the upload was accepted
+        return None, None, ({
+            'status': 'error',
+            'message': 'The uploaded file is no longer available, please upload it again'
+        }, 500)
+    
+    # Parse the EPUB file to extract words
+    words = parse_epub_file(epub_path, progress=progress, counts=counts)
+    
+    if not words:
+        return None, None, ({
+            'status': 'error',
+            'message': 'No words could be extracted from the EPUB file'
+        }, 400)
+    
+    # Save the extracted words to a file
+    filename = save_epub_words(epub_filename, sorted(words) if counts else words)
+    
+    if filename is None:
+        return None, None, ({
+            'status': 'error',
+            'message': 'Error saving extracted words to file'
+        }, 500)
+    
+    cache_epub_words(epub_hash, words, filename)
+    return words, filename, None
+
+def _run_upload_epub(epub_hash, epub_path, epub_filename, progress=None):
+    """Job body for /api/upload-epub"""
+    words, filename, error = _extract_epub_words(epub_hash, epub_path, epub_filename, progress)
+    if error:
+        return error
+    
+    return {
+        'status': 'success',
+        'message': f'{len(words)} words extracted and saved to "{filename}"',
+        'filename': filename,
+        'word_count': len(words),
+        'words': words[:20] if len(words) > 20 else words  # Send only the first 20 words
+    }, 200
+
+def _run_epub_to_book(book_name, epub_hash, epub_path, epub_filename, import_filter, progress=None):
+    """Job body for /api/epub-to-book"""
+    words, filename, error = _extract_epub_words(epub_hash, epub_path, epub_filename, progress,
+                                                 import_filter.needs_counts)
+    if error:
+        return error
+    
+    return _add_extracted_words(book_name, words, filename, import_filter)
+
 @bp.route('/api/upload-epub', methods=['POST'])
 def upload_epub():
     """API endpoint to upload and process an EPUB file"""
@@ -241,40 +611,12 @@ def upload_epub():
         }), 400
     
     if file and allowed_file(file.filename):
-        # Save the uploaded file
-        epub_path, epub_filename = save_epub_file(file)
-        
-        if not epub_path or not epub_filename:
-            return jsonify({
-                'status': 'error',
-                'message': 'Error saving the uploaded file'
-            }), 500
-        
-        # Parse the EPUB file to extract words
-        words = parse_epub_file(epub_path)
-        
-        if not words:
-            return jsonify({
-                'status': 'error',
-                'message': 'No words could be extracted from the EPUB file'
-            }), 400
+        epub_hash, epub_path, epub_filename, error = _save_epub_upload(file)
+        if error:
+            return error
         
-        # Save the extracted words to a file
-        filename = save_epub_words(epub_filename, words)
-        
-        if filename is None:
-            return jsonify({
-                'status': 'error',
-                'message': 'Error saving extracted words to file'
-            }), 500
-        
-        return jsonify({
-            'status': 'success',
-            'message': f'{len(words)} words extracted and saved to "{filename}"',
-            'filename': filename,
-            'word_count': len(words),
-            'words': words[:20] if len(words) > 20 else words  # Send only the first 20 words
-        })
+        return _dispatch('upload-epub', 'chapters', _run_upload_epub,
+                         epub_hash, epub_path, epub_filename)
     
     return jsonify({
         'status': 'error',
@@ -315,50 +657,37 @@ def epub_to_book():
         }), 400
     
     if file and allowed_file(file.filename):
-        # Save the uploaded file
-        epub_path, epub_filename = save_epub_file(file)
-        
-        if not epub_path or not epub_filename:
-            return jsonify({
-                'status': 'error',
-                'message': 'Error saving the uploaded file'
-            }), 500
-        
-        # Parse the EPUB file to extract words
-        words = parse_epub_file(epub_path)
-        
-        if not words:
-            return jsonify({
-                'status': 'error',
-                'message': 'No words could be extracted from the EPUB file'
-            }), 400
-        
-        # Save the extracted words to a file
-        filename = save_epub_words(epub_filename, words)
-        
-        if filename is None:
-            return jsonify({
-                'status': 'error',
-                'message': 'Error saving extracted words to file'
-            }), 500
+        import_filter, error = _read_import_filter()
+        if error:
+            return error
         
-        # Add words to the vocabulary book
-        word_count = add_words_to_book(book_name, words)
+        epub_hash, epub_path, epub_filename, error = _save_epub_upload(file, import_filter.needs_counts)
+        if error:
+            return error
         
-        return jsonify({
-            'status': 'success',
-            'message': f'{len(words)} words extracted, {word_count} new words added to "{book_name}"',
-            'filename': filename,
-            'word_count': len(words),
-            'new_word_count': word_count,
-            'words': words[:20] if len(words) > 20 else words  # Send only the first 20 words
-        })
+        return _dispatch('epub-to-book', 'chapters', _run_epub_to_book,
+                         book_name, epub_hash, epub_path, epub_filename, import_filter)
     
     return jsonify({
         'status': 'error',
         'message': 'File type not allowed. Please upload an EPUB file.'
     }), 400
 
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """API endpoint to poll the status, progress and result of a background job"""
+    job = _jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Job "{job_id}" not found'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'job': job
+    })
+
 @bp.route('/uploads/<filename>')
 def uploaded_file(filename):
     """Serve the uploaded files"""
@@ -386,14 +715,15 @@ def get_vocab_test_words():
             'message': 'Invalid session number'
         }), 400
     
-    # Get test words for this session
-    test_words = get_test_words(session_num)
+    def build():
+        return {
+            'status': 'success',
+            'words': get_test_words(session_num),
+            'session': session_num
+        }
     
-    return jsonify({
-        'status': 'success',
-        'words': test_words,
-        'session': session_num
-    })
+    # Test words depend only on the session and the word list loaded at startup
+    return _payloads.response(('vocab_test', session_num), None, build)
 
 @bp.route('/api/vocab_test/calculate', methods=['POST'])
 def calculate_vocab_test_results():
@@ -414,6 +744,35 @@ def calculate_vocab_test_results():
         'results': results
     })
 
+@bp.route('/api/words/ranks', methods=['POST'])
+def get_word_ranks():
+    """
+    API endpoint to look up the COCA rank and band of a list of words
+    
+    Takes {"words": [...]}; the sort and order query parameters work as for
+    /api/books/<book_name>/ranks, defaulting to the order given.
+    """
+    data = request.get_json(silent=True)
+    words = data.get('words') if isinstance(data, dict) else None
+    if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+        return jsonify({
+            'status': 'error',
+            'message': 'Words are required'
+        }), 400
+    sort, reverse, error = _rank_order_args('book')
+    if error:
+        return error
+    lookup = get_rank_lookup()
+    if lookup is None:
+        return _rank_lookup_unavailable()
+    
+    entries = sort_ranked(lookup.annotate(words), sort, reverse)
+    return jsonify({
+        'status': 'success',
+        'word_count': len(entries),
+        'words': entries
+    })
+
 # API endpoints for managing done words
 @bp.route('/api/words/done', methods=['POST'])
 def mark_done():
@@ -427,18 +786,14 @@ def mark_done():
     
     word = data['word']
     
-    # Get list of books that contain this word (for response info)
-    books_containing_word = []
-    all_books = get_all_books()
-    for book in all_books:
-        if book != 'done' and word in get_words_from_book(book):
-            books_containing_word.append(book)
+    # Books the word was removed from are returned for response info
+    removed_from_books = mark_word_as_done(word)
     
-    if mark_word_as_done(word):
+    if removed_from_books is not None:
         return jsonify({
             'status': 'success',
             'message': f'Word "{word}" marked as done successfully',
-            'removed_from_books': books_containing_word
+            'removed_from_books': removed_from_books
         })
     else:
         return jsonify({
@@ -446,16 +801,40 @@ def mark_done():
             'message': f'Word "{word}" is already marked as done'
         }), 400
 
-@bp.route('/api/words/done', methods=['GET'])
-def get_done():
-    """API endpoint to get all words marked as done"""
-    words = get_done_words()
+@bp.route('/api/words/done/batch', methods=['POST'])
+def mark_done_batch():
+    """API endpoint to mark multiple words as done (recognized) at once"""
+    data = request.get_json(silent=True)
+    words = data.get('words') if isinstance(data, dict) else None
+    if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+        return jsonify({
+            'status': 'error',
+            'message': 'Words are required'
+        }), 400
+    
+    result = mark_words_as_done(words)
+    
     return jsonify({
         'status': 'success',
-        'word_count': len(words),
-        'words': words
+        'message': f'{len(result["marked"])} words marked as done, {len(result["already_done"])} were already done',
+        'marked': result['marked'],
+        'already_done': result['already_done'],
+        'removed_from_books': result['removed_from_books']
     })
 
+@bp.route('/api/words/done', methods=['GET'])
+def get_done():
+    """API endpoint to get all words marked as done"""
+    def build():
+        words = get_done_words()
+        return {
+            'status': 'success',
+            'word_count': len(words),
+            'words': words
+        }
+    
+    return _payloads.response('done', get_done_version(), build)
+
 # Initialize vocabulary assessment
 vocab_assessment = VocabularyAssessment()
 
@@ -0,0 +1,411 @@
+"""
+SQLite storage backend
+
+Keeps vocabulary books, done words and assessment results in a single SQLite
+database instead of flat files. The database runs in WAL mode so several
+processes (e.g. gunicorn workers) can read while one writes, and every
+mutation is a transaction, so concurrent writers never see or leave a
+half-written book.
+
+The stores here expose the same methods as WordStore and JsonResultStore and
+are selected with STORAGE_BACKEND=sqlite (see storage.py). Existing files can
+be copied into a database with:
+
+    python3 sqlite_store.py import
+"""
+
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS book_words (
+    id INTEGER PRIMARY KEY,
+    book TEXT NOT NULL REFERENCES books(name) ON DELETE CASCADE,
+    word TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_book_words_book_word ON book_words(book, word);
+CREATE INDEX IF NOT EXISTS idx_book_words_word ON book_words(word);
+CREATE TABLE IF NOT EXISTS assessment_results (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_assessment_results_user_timestamp
+    ON assessment_results(user_id, timestamp);
+"""
+
+# Maximum number of parameters bound in one IN (...) lookup
+_QUERY_CHUNK_SIZE = 500
+
+
+def _chunks(items, size=_QUERY_CHUNK_SIZE):
+    """Split a list into lists of at most size items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SQLiteDatabase:
+    """A SQLite database file with one connection per thread"""
+
+    def __init__(self, path):
+        """
+        Open (and if needed create) the database
+
+        Args:
+            path (str): Path of the database file
+        """
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self.connection()
+        conn.executescript(SCHEMA)
+        # Databases created before books had a version column
+        if 'version' not in {column for _, column, *_ in conn.execute('PRAGMA table_info(books)')}:
+            conn.execute('ALTER TABLE books ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+
+    def connection(self):
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly below
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block of statements as one write transaction
+
+        BEGIN IMMEDIATE takes the write lock up front, so two writers never
+        both read a book and then race to modify it. Transactions nest: an
+        inner block joins the outermost one, which commits or rolls back.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+
+class SQLiteWordStore:
+    """Vocabulary books stored as rows of a SQLite database"""
+
+    def __init__(self, database):
+        """
+        Initialize the word store
+
+        Args:
+            database (SQLiteDatabase): Database holding the books
+        """
+        self.database = database
+
+    @staticmethod
+    def _bump_version(conn, book_name):
+        """Record a change to a book's contents"""
+        conn.execute('UPDATE books SET version = version + 1 WHERE name = ?', (book_name,))
+
+    def locked(self, book_name):
+        """Run a batch of operations on a book as one write transaction"""
+        return self.database.transaction()
+
+    def list_books(self):
+        """Get the names of all books"""
+        rows = self.database.connection().execute('SELECT name FROM books ORDER BY name')
+        return [name for name, in rows]
+
+    def exists(self, book_name):
+        """Check whether a book exists"""
+        row = self.database.connection().execute(
+            'SELECT 1 FROM books WHERE name = ?', (book_name,)).fetchone()
+        return row is not None
+
+    def create(self, book_name):
+        """
+        Create an empty book
+
+        Returns:
+            bool: False if the book already exists
+        """
+        with self.database.transaction() as conn:
+            cursor = conn.execute('INSERT OR IGNORE INTO books (name) VALUES (?)', (book_name,))
+            return cursor.rowcount > 0
+
+    def get_words(self, book_name):
+        """
+        Get the words of a book in insertion order
+
+        Returns:
+            list: The book's words, empty if the book does not exist
+        """
+        rows = self.database.connection().execute(
+            'SELECT word FROM book_words WHERE book = ? ORDER BY id', (book_name,))
+        return [word for word, in rows]
+
+    def get_version(self, book_name):
+        """
+        Get a string that changes whenever a book's contents change
+
+        Every append, rewrite and removal bumps the book's version counter in
+        the same transaction. Row ids cannot serve instead: without
+        AUTOINCREMENT the id of a removed last row is handed out again.
+
+        Returns:
+            str: The book's version, or None if the book does not exist
+        """
+        row = self.database.connection().execute(
+            'SELECT version FROM books WHERE name = ?', (book_name,)).fetchone()
+        return None if row is None else f"{row[0]:x}"
+
+    def get_page(self, book_name, offset=0, limit=None, prefix=None):
+        """
+        Get a slice of a book's words in insertion order
+
+        Prefix matches are found with a range scan on the (book, word) index.
+
+        Args:
+            book_name (str): Name of the book
+            offset (int): Number of matching words to skip
+            limit (int): Maximum number of words to return, None for all
+            prefix (str): Only return words starting with this prefix
+
+        Returns:
+            tuple: (words on the page, total number of matching words)
+        """
+        where, params = 'book = ?', [book_name]
+        if prefix:
+            where += ' AND word >= ? AND word < ?'
+            params += [prefix, prefix + '\U0010ffff']
+        conn = self.database.connection()
+        total, = conn.execute(f'SELECT COUNT(*) FROM book_words WHERE {where}', params).fetchone()
+        rows = conn.execute(f'SELECT word FROM book_words WHERE {where} ORDER BY id LIMIT ? OFFSET ?',
+                            params + [-1 if limit is None else limit, offset])
+        return [word for word, in rows], total
+
+    def get_word_set(self, book_name):
+        """
+        Get the words of a book as a set for membership checks
+
+        Returns:
+            frozenset: The book's words, empty if the book does not exist
+        """
+        rows = self.database.connection().execute(
+            'SELECT word FROM book_words WHERE book = ?', (book_name,))
+        return frozenset(word for word, in rows)
+
+    def contains(self, book_name, word):
+        """Check whether a book contains a word"""
+        row = self.database.connection().execute(
+            'SELECT 1 FROM book_words WHERE book = ? AND word = ? LIMIT 1',
+            (book_name, word)).fetchone()
+        return row is not None
+
+    def append(self, book_name, words):
+        """
+        Append words to a book, creating it if needed
+
+        The caller is responsible for deduplication; every word given is stored.
+        """
+        if not words:
+            return
+        with self.database.transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO books (name) VALUES (?)', (book_name,))
+            conn.executemany('INSERT INTO book_words (book, word) VALUES (?, ?)',
+                             ((book_name, word) for word in words))
+            self._bump_version(conn, book_name)
+
+    def rewrite(self, book_name, words):
+        """Replace the contents of a book with the given words"""
+        with self.database.transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO books (name) VALUES (?)', (book_name,))
+            conn.execute('DELETE FROM book_words WHERE book = ?', (book_name,))
+            conn.executemany('INSERT INTO book_words (book, word) VALUES (?, ?)',
+                             ((book_name, word) for word in words))
+            self._bump_version(conn, book_name)
+
+    def remove(self, book_name, word):
+        """
+        Remove every occurrence of a word from a book
+
+        Returns:
+            bool: True if the word was present
+        """
+        return self.remove_words(book_name, {word}) > 0
+
+    def remove_words(self, book_name, words):
+        """
+        Remove a set of words from a book in one transaction
+
+        Args:
+            book_name (str): Name of the book
+            words (set): Words to remove
+
+        Returns:
+            int: Number of distinct words that were present and removed
+        """
+        present = set()
+        with self.database.transaction() as conn:
+            for chunk in _chunks(list(words)):
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f'SELECT DISTINCT word FROM book_words WHERE book = ? AND word IN ({placeholders})',
+                    [book_name, *chunk])
+                present.update(word for word, in rows)
+                conn.execute(
+                    f'DELETE FROM book_words WHERE book = ? AND word IN ({placeholders})',
+                    [book_name, *chunk])
+            if present:
+                self._bump_version(conn, book_name)
+        return len(present)
+
+    def books_containing(self, word):
+        """
+        Find every book that contains a word
+
+        Returns:
+            list: Sorted names of the books holding the word
+        """
+        rows = self.database.connection().execute(
+            'SELECT DISTINCT book FROM book_words WHERE word = ? ORDER BY book', (word,))
+        return [book for book, in rows]
+
+    def books_containing_words(self, words):
+        """
+        Group words by the books that contain them
+
+        Args:
+            words (iterable): Words to look up
+
+        Returns:
+            dict: Book name -> set of the given words found in that book
+        """
+        by_book = {}
+        conn = self.database.connection()
+        for chunk in _chunks(list(set(words))):
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT DISTINCT book, word FROM book_words WHERE word IN ({placeholders})', chunk)
+            for book, word in rows:
+                by_book.setdefault(book, set()).add(word)
+        return by_book
+
+
+class SQLiteResultStore:
+    """Assessment results stored as rows of a SQLite database"""
+
+    def __init__(self, database):
+        """
+        Initialize the result store
+
+        Args:
+            database (SQLiteDatabase): Database holding the results
+        """
+        self.database = database
+
+    def add_result(self, user_id, result):
+        """Record an assessment result for a user"""
+        with self.database.transaction() as conn:
+            conn.execute(
+                'INSERT INTO assessment_results (user_id, timestamp, result) VALUES (?, ?, ?)',
+                (user_id, result.get('timestamp', 0), json.dumps(result)))
+
+    def list_users(self):
+        """Get the ids of all users with results"""
+        rows = self.database.connection().execute('SELECT DISTINCT user_id FROM assessment_results')
+        return [user_id for user_id, in rows]
+
+    def get_results(self, user_id):
+        """
+        Get a user's assessment results, oldest first
+
+        Returns:
+            list: The user's results, empty if there are none
+        """
+        rows = self.database.connection().execute(
+            'SELECT result FROM assessment_results WHERE user_id = ? ORDER BY timestamp, id',
+            (user_id,))
+        return [json.loads(result) for result, in rows]
+
+    def replace_results(self, user_id, results):
+        """Replace all of a user's assessment results"""
+        with self.database.transaction() as conn:
+            conn.execute('DELETE FROM assessment_results WHERE user_id = ?', (user_id,))
+            conn.executemany(
+                'INSERT INTO assessment_results (user_id, timestamp, result) VALUES (?, ?, ?)',
+                ((user_id, result.get('timestamp', 0), json.dumps(result)) for result in results))
+
+
+def import_files(database, vocab_dir, results_dir):
+    """
+    Copy books, done words and assessment results from files into a database
+
+    Each book and each user's results replace whatever the database already
+    holds for them, so running the import again is safe.
+
+    Args:
+        database (SQLiteDatabase): Database to import into
+        vocab_dir (str): Directory holding the <book>.txt files (including done.txt)
+        results_dir (str): Directory holding the <user_id>.json result files
+
+    Returns:
+        dict: Number of 'books', 'words' and 'results' imported
+    """
+    from word_store import WordStore
+    from result_store import JsonResultStore
+
+    counts = {'books': 0, 'words': 0, 'results': 0}
+
+    word_store = WordStore(vocab_dir)
+    sqlite_words = SQLiteWordStore(database)
+    for book_name in sorted(word_store.list_books()):
+        words = word_store.get_words(book_name)
+        sqlite_words.rewrite(book_name, words)
+        counts['books'] += 1
+        counts['words'] += len(words)
+
+    if os.path.isdir(results_dir):
+        result_store = JsonResultStore(results_dir)
+        sqlite_results = SQLiteResultStore(database)
+        for user_id in sorted(result_store.list_users()):
+            results = result_store.get_results(user_id)
+            sqlite_results.replace_results(user_id, results)
+            counts['results'] += len(results)
+
+    return counts
+
+
+if __name__ == '__main__':
+    from utils import get_app_dirs, SQLITE_DB_PATH
+    from vocab_assessment import USER_RESULTS_DIR
+
+    parser = argparse.ArgumentParser(description='Manage the SQLite storage backend')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help='Import books, done words and assessment results from files')
+    import_parser.add_argument('--db', default=SQLITE_DB_PATH, help='Database file to import into')
+    import_parser.add_argument('--vocab-dir', default=get_app_dirs()['VOCAB_DIR'], help='Vocabulary books directory')
+    import_parser.add_argument('--results-dir', default=USER_RESULTS_DIR, help='Assessment results directory')
+    args = parser.parse_args()
+
+    counts = import_files(SQLiteDatabase(args.db), args.vocab_dir, args.results_dir)
+    print(f"Imported {counts['books']} books ({counts['words']} words) "
+          f"and {counts['results']} assessment results into {args.db}")
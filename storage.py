@@ -0,0 +1,67 @@
+"""
+Storage backend selection
+
+Books, done words and assessment results are kept in flat files by default.
+Setting STORAGE_BACKEND=sqlite keeps them in the SQLite database at
+SQLITE_DB_PATH instead, which lets several worker processes share state safely.
+"""
+
+from utils import STORAGE_BACKEND, SQLITE_DB_PATH, BOOK_LOG_COMPACT_BYTES
+
+STORAGE_BACKENDS = ('files', 'sqlite')
+
+_database = None
+
+
+def _get_database():
+    """Get the shared SQLite database, opening it on first use"""
+    global _database
+    if _database is None:
+        from sqlite_store import SQLiteDatabase
+        _database = SQLiteDatabase(SQLITE_DB_PATH)
+    return _database
+
+
+def _check_backend():
+    """Raise ValueError for an unknown STORAGE_BACKEND"""
+    if STORAGE_BACKEND not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND!r} "
+                         f"(expected one of {', '.join(STORAGE_BACKENDS)})")
+
+
+def create_word_store(vocab_dir):
+    """
+    Create the store for vocabulary books and done words
+
+    Args:
+        vocab_dir (str): Directory of the book files, used by the files backend
+
+    Returns:
+        WordStore or SQLiteWordStore: The configured word store
+    """
+    _check_backend()
+    if STORAGE_BACKEND == 'sqlite':
+        from sqlite_store import SQLiteWordStore
+        return SQLiteWordStore(_get_database())
+
+    from word_store import WordStore
+    return WordStore(vocab_dir, compact_bytes=BOOK_LOG_COMPACT_BYTES)
+
+
+def create_result_store(results_dir):
+    """
+    Create the store for assessment results
+
+    Args:
+        results_dir (str): Directory of the result files, used by the files backend
+
+    Returns:
+        JsonResultStore or SQLiteResultStore: The configured result store
+    """
+    _check_backend()
+    if STORAGE_BACKEND == 'sqlite':
+        from sqlite_store import SQLiteResultStore
+        return SQLiteResultStore(_get_database())
+
+    from result_store import JsonResultStore
+    return JsonResultStore(results_dir)
@@ -1,7 +1,10 @@
+import io
 import os
 import pytest
 import tempfile
 import json
+import time
+import sqlite3
 from app import app
 
 @pytest.fixture
@@ -76,3 +79,758 @@ def test_add_batch_words(client):
     assert 'word1' in data['words']
     assert 'word2' in data['words']
     assert 'word3' in data['words']
+
+@pytest.fixture
+def vocab_dir(tmp_path, monkeypatch):
+    """Point book_manager at an empty temporary vocabulary directory"""
+    import book_manager
+    from word_store import WordStore
+    monkeypatch.setattr(book_manager, 'VOCAB_DIR', str(tmp_path))
+    monkeypatch.setattr(book_manager, 'DONE_WORDS_FILE', str(tmp_path / 'done.txt'))
+    monkeypatch.setattr(book_manager, '_store', WordStore(str(tmp_path)))
+    return tmp_path
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """Point book_manager at a SQLite word store in a temporary database"""
+    import book_manager
+    from sqlite_store import SQLiteDatabase, SQLiteWordStore
+    database = SQLiteDatabase(str(tmp_path / 'wordbook.db'))
+    monkeypatch.setattr(book_manager, '_store', SQLiteWordStore(database))
+    return database
+
+def test_sqlite_store_manages_books_and_done_words(sqlite_db):
+    """Test book management and marking words as done on the SQLite backend"""
+    from book_manager import (create_book, book_exists, get_all_books, add_words_to_book,
+                              get_words_from_book, mark_words_as_done, get_done_words)
+    assert create_book('novel')
+    assert not create_book('novel')
+    assert book_exists('novel') and not book_exists('missing')
+    
+    result = add_words_to_book('novel', ['cat', 'dog', 'cat', 'emu'])
+    assert result == {'added': 3, 'duplicates': 1, 'already_done': 0}
+    assert get_words_from_book('novel') == ['cat', 'dog', 'emu']
+    
+    result = mark_words_as_done(['dog', 'emu', 'fox'])
+    assert result['removed_from_books'] == {'novel': 2}
+    assert get_words_from_book('novel') == ['cat']
+    assert get_done_words() == ['dog', 'emu', 'fox']
+    assert get_all_books() == ['done', 'novel']
+    assert add_words_to_book('novel', ['dog'])['already_done'] == 1
+    
+    # Removing the newest word and appending another must not repeat a version
+    from sqlite_store import SQLiteDatabase, SQLiteWordStore
+    store = SQLiteWordStore(sqlite_db)
+    store.rewrite('pair', ['a', 'foo'])
+    versions = {store.get_version('pair')}
+    store.remove('pair', 'foo')
+    versions.add(store.get_version('pair'))
+    store.append('pair', ['bar'])
+    versions.add(store.get_version('pair'))
+    assert store.get_words('pair') == ['a', 'bar'] and len(versions) == 3
+    assert store.remove('pair', 'missing') is False and store.get_version('pair') in versions
+    assert store.get_version('missing') is None
+    
+    # Databases created before the version column are upgraded on open
+    legacy = sqlite3.connect(sqlite_db.path + '.old')
+    legacy.executescript('CREATE TABLE books (name TEXT PRIMARY KEY); INSERT INTO books VALUES (\'old\');')
+    legacy.close()
+    assert SQLiteWordStore(SQLiteDatabase(sqlite_db.path + '.old')).get_version('old') == '0'
+
+def test_sqlite_import_copies_books_and_results(tmp_path):
+    """Test that the importer copies book files and result history into the database"""
+    from sqlite_store import SQLiteDatabase, SQLiteResultStore, SQLiteWordStore, import_files
+    from vocab_assessment import VocabularyAssessment
+    vocab = tmp_path / 'books'
+    vocab.mkdir()
+    (vocab / 'novel.txt').write_text('alpha\nbeta\n', encoding='utf-8')
+    (vocab / 'done.txt').write_text('gamma\n', encoding='utf-8')
+    results = tmp_path / 'results'
+    results.mkdir()
+    (results / 'ann.json').write_text(json.dumps({'results': [
+        {'vocabulary_size': 2000, 'cefr_level': 'B1', 'timestamp': 0}]}))
+    
+    database = SQLiteDatabase(str(tmp_path / 'wordbook.db'))
+    for _ in range(2):  # Importing again replaces rather than duplicates
+        counts = import_files(database, str(vocab), str(results))
+    assert counts == {'books': 2, 'words': 3, 'results': 1}
+    assert SQLiteWordStore(database).get_words('novel') == ['alpha', 'beta']
+    
+    assessment = VocabularyAssessment(result_store=SQLiteResultStore(database))
+    assessment.save_result('ann', {'vocabulary_size': 4000, 'cefr_level': 'B2'})
+    history = assessment.get_user_history('ann')
+    assert [r['vocabulary_size'] for r in history['results']] == [2000, 4000]
+    assert history['average_vocabulary_size'] == 3000
+    assert assessment.get_user_history('bob') == {'results': []}
+
+def test_word_store_serves_from_memory_and_reloads_on_change(vocab_dir):
+    """Test that the word store caches books and picks up external edits"""
+    from book_manager import add_word_to_book, get_words_from_book, _store
+    (vocab_dir / 'cached.txt').write_text('alpha\nbeta\n', encoding='utf-8')
+    
+    assert get_words_from_book('cached') == ['alpha', 'beta']
+    assert add_word_to_book('cached', 'gamma')
+    assert not add_word_to_book('cached', 'alpha')
+    assert (vocab_dir / 'cached.txt').read_text(encoding='utf-8') == 'alpha\nbeta\ngamma\n'
+    
+    # An edit made outside the store changes size and is reloaded
+    (vocab_dir / 'cached.txt').write_text('delta\n', encoding='utf-8')
+    assert get_words_from_book('cached') == ['delta']
+    assert _store.contains('cached', 'delta')
+    assert not _store.contains('cached', 'alpha')
+
+def test_mark_done_touches_only_books_with_word(client, vocab_dir):
+    """Test that marking a word done reports and logs removals only for the books holding it"""
+    from book_manager import get_words_from_book
+    (vocab_dir / 'book_a.txt').write_text('apple\nbanana\n', encoding='utf-8')
+    (vocab_dir / 'book_b.txt').write_text('cherry\n', encoding='utf-8')
+    (vocab_dir / 'book_c.txt').write_text('banana\ndate\n', encoding='utf-8')
+    untouched_mtime = os.stat(vocab_dir / 'book_b.txt').st_mtime_ns
+    
+    response = client.post('/api/words/done', json={'word': 'banana'})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['removed_from_books'] == ['book_a', 'book_c']
+    assert get_words_from_book('book_a') == ['apple']
+    assert get_words_from_book('book_c') == ['date']
+    assert (vocab_dir / 'book_a.log').read_text(encoding='utf-8') == '-banana\n'
+    assert os.stat(vocab_dir / 'book_b.txt').st_mtime_ns == untouched_mtime
+    assert not (vocab_dir / 'book_b.log').exists()
+    assert (vocab_dir / 'done.txt').read_text(encoding='utf-8') == 'banana\n'
+    
+    response = client.post('/api/words/done', json={'word': 'banana'})
+    assert response.status_code == 400
+
+def test_mark_done_batch(client, vocab_dir):
+    """Test marking many words done logs each affected book's removals in one write"""
+    from book_manager import get_words_from_book
+    (vocab_dir / 'book_a.txt').write_text('apple\nbanana\ncherry\n', encoding='utf-8')
+    (vocab_dir / 'book_b.txt').write_text('banana\ndate\n', encoding='utf-8')
+    (vocab_dir / 'done.txt').write_text('elder\n', encoding='utf-8')
+    
+    response = client.post('/api/words/done/batch',
+                          json={'words': ['apple', 'banana', 'cherry', 'elder', 'apple']})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['marked'] == ['apple', 'banana', 'cherry']
+    assert data['already_done'] == ['elder']
+    assert data['removed_from_books'] == {'book_a': 3, 'book_b': 1}
+    assert get_words_from_book('book_a') == []
+    assert get_words_from_book('book_b') == ['date']
+    assert (vocab_dir / 'done.txt').read_text(encoding='utf-8') == 'elder\napple\nbanana\ncherry\n'
+    
+    for words in (['fig', {'word': 'grape'}], ['fig', ['grape']], ['fig', 7], 'fig'):
+        assert client.post('/api/words/done/batch', json={'words': words}).status_code == 400
+    assert (vocab_dir / 'done.txt').read_text(encoding='utf-8') == 'elder\napple\nbanana\ncherry\n'
+
+def test_book_log_replays_and_compacts(vocab_dir):
+    """Test that removals go to the book log and are folded into the snapshot past the threshold"""
+    from word_store import WordStore
+    (vocab_dir / 'logged.txt').write_text('alpha\nbeta\ngamma\n', encoding='utf-8')
+    store = WordStore(str(vocab_dir), compact_bytes=1024)
+    
+    assert store.remove_words('logged', {'beta', 'zeta'}) == 1
+    store.append('logged', ['delta', 'alpha'])
+    assert (vocab_dir / 'logged.txt').read_text(encoding='utf-8') == 'alpha\nbeta\ngamma\n'
+    assert (vocab_dir / 'logged.log').read_text(encoding='utf-8') == '-beta\n+delta\n+alpha\n'
+    
+    # Another process sees the snapshot plus the log, including a later appended record
+    other = WordStore(str(vocab_dir))
+    assert other.get_words('logged') == ['alpha', 'gamma', 'delta']
+    with open(vocab_dir / 'logged.log', 'a', encoding='utf-8') as f:
+        f.write('-gamma\n+beta\n+eps')  # A torn last record is never applied
+    assert other.get_words('logged') == ['alpha', 'delta', 'beta']
+    assert other.books_containing('gamma') == []
+    
+    store.compact_bytes = 1
+    store.remove('logged', 'alpha')
+    deadline = time.time() + 5
+    while (vocab_dir / 'logged.log').exists() and time.time() < deadline:
+        time.sleep(0.01)
+    assert (vocab_dir / 'logged.txt').read_text(encoding='utf-8') == 'delta\nbeta\n'
+    assert other.get_words('logged') == ['delta', 'beta']
+
+def _hammer_books(worker, rounds, results_dir):
+    """Stress test worker: add, mark done and save results from a separate process"""
+    import book_manager
+    from result_store import JsonResultStore
+    from vocab_assessment import VocabularyAssessment
+    book_manager._store.compact_bytes = 64  # Compact often to race it against writers
+    assessment = VocabularyAssessment(result_store=JsonResultStore(results_dir))
+    with app.test_client() as client:
+        for i in range(rounds):
+            words = [f'w{worker}x{i}', 'shared', f'w{(worker + 1) % 4}x{i}']
+            assert client.post('/api/books/stress/words/batch', json={'words': words}).status_code == 200
+            if i % 3 == 0:
+                client.post('/api/words/done', json={'word': f'w{worker}x{i}'})
+            assessment.save_result('stress', {'vocabulary_size': 100, 'cefr_level': 'A1'})
+
+def test_concurrent_writers_do_not_lose_updates(vocab_dir, tmp_path):
+    """Test that books, done words and results stay consistent under writers in many processes"""
+    import multiprocessing
+    from word_store import WordStore
+    from result_store import JsonResultStore
+    (vocab_dir / 'stress.txt').write_text('', encoding='utf-8')
+    results_dir = str(tmp_path / 'results')
+    workers, rounds = 4, 15
+    
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=_hammer_books, args=(w, rounds, results_dir)) for w in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+    
+    store = WordStore(str(vocab_dir))
+    words = store.get_words('stress')
+    done = store.get_words('done')
+    expected_done = {f'w{w}x{i}' for w in range(workers) for i in range(0, rounds, 3)}
+    expected = {f'w{w}x{i}' for w in range(workers) for i in range(rounds)} | {'shared'}
+    assert sorted(done) == sorted(expected_done)
+    assert len(words) == len(set(words))
+    # A done word may be re-added by a neighbour's batch after it was marked done
+    assert set(words) | expected_done == expected
+    assert len(JsonResultStore(results_dir).get_results('stress')) == workers * rounds
+
+@pytest.mark.parametrize('backend', ['files', 'sqlite'])
+def test_get_book_pages_filters_and_revalidates(client, vocab_dir, tmp_path, monkeypatch, backend):
+    """Test paginated, prefix-filtered and count-only book reads with ETag revalidation"""
+    import book_manager
+    from sqlite_store import SQLiteDatabase, SQLiteWordStore
+    if backend == 'sqlite':
+        monkeypatch.setattr(book_manager, '_store', SQLiteWordStore(SQLiteDatabase(str(tmp_path / 'db.sqlite'))))
+    book_manager.add_words_to_book('paged', ['beta', 'apple', 'banana', 'cherry', 'bean'])
+    book_manager._store.remove('paged', 'banana')
+    
+    data = client.get('/api/books/paged?limit=2').get_json()
+    assert data['words'] == ['beta', 'apple'] and data['word_count'] == 4 and data['next_offset'] == 2
+    data = client.get('/api/books/paged?offset=2&limit=2').get_json()
+    assert data['words'] == ['cherry', 'bean'] and data['next_offset'] is None
+    data = client.get('/api/books/paged?prefix=B&limit=1').get_json()
+    assert data['words'] == ['beta'] and data['word_count'] == 2 and data['next_offset'] == 1
+    data = client.get('/api/books/paged?fields=count').get_json()
+    assert data == {'status': 'success', 'book_name': 'paged', 'word_count': 4}
+    assert client.get('/api/books/paged?limit=-1').status_code == 400
+    
+    response = client.get('/api/books/paged')
+    etag = response.headers['ETag']
+    assert client.get('/api/books/paged', headers={'If-None-Match': etag}).status_code == 304
+    book_manager.add_word_to_book('paged', 'date')
+    response = client.get('/api/books/paged', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.get_json()['words'][-1] == 'date'
+
+def test_book_and_word_ranks(client, vocab_dir):
+    """Test COCA rank annotation of book words and of posted word lists"""
+    from book_manager import add_words_to_book
+    add_words_to_book('ranked', ['blimp', 'habit', 'zzyzxq', 'the', 'year'])
+    
+    data = client.get('/api/books/ranked/ranks').get_json()
+    assert [w['word'] for w in data['words']] == ['the', 'year', 'habit', 'blimp', 'zzyzxq']
+    assert data['words'][0] == {'word': 'the', 'rank': 1, 'band': 1}
+    assert data['words'][3] == {'word': 'blimp', 'rank': 24067, 'band': 5}
+    assert data['words'][4] == {'word': 'zzyzxq', 'rank': None, 'band': None}
+    assert data['band_counts'][0] == {'band': 1, 'count': 3} and data['unranked_count'] == 1
+    
+    data = client.get('/api/books/ranked/ranks?sort=band&order=desc').get_json()
+    assert [w['word'] for w in data['words']] == ['zzyzxq', 'blimp', 'habit', 'the', 'year']
+    data = client.get('/api/books/ranked/ranks?band=1&sort=book').get_json()
+    assert [w['word'] for w in data['words']] == ['habit', 'the', 'year'] and data['word_count'] == 3
+    assert client.get('/api/books/ranked/ranks?band=11').status_code == 400
+    assert client.get('/api/books/ranked/ranks?sort=size').status_code == 400
+    assert client.get('/api/books/missing/ranks').status_code == 404
+    
+    response = client.post('/api/words/ranks?sort=rank', json={'words': ['Habit', 'and']})
+    assert response.get_json()['words'] == [{'word': 'and', 'rank': 3, 'band': 1},
+                                            {'word': 'Habit', 'rank': 2322, 'band': 1}]
+    assert client.post('/api/words/ranks', json={'words': 'habit'}).status_code == 400
+
+def test_word_list_responses_are_compressed_and_revalidated(client, vocab_dir):
+    """Test gzip negotiation, content-hash ETags and their reuse until the data changes"""
+    import gzip
+    from book_manager import add_words_to_book, mark_word_as_done
+    add_words_to_book('done', [f'word{i}' for i in range(500)])
+    
+    plain = client.get('/api/words/done')
+    assert 'Content-Encoding' not in plain.headers and plain.get_json()['word_count'] == 500
+    compressed = client.get('/api/words/done', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.data) == plain.data
+    assert len(compressed.data) < len(plain.data) // 3
+    
+    etag = plain.headers['ETag']
+    assert compressed.headers['ETag'] == f'W/{etag}'
+    assert client.get('/api/words/done', headers={'If-None-Match': etag}).status_code == 304
+    mark_word_as_done('extra')
+    assert client.get('/api/words/done', headers={'If-None-Match': etag}).status_code == 200
+    
+    # Small payloads are sent as is
+    small = client.get('/api/books/missing', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+def test_add_words_to_book_merge_counts(vocab_dir):
+    """Test that batch adds dedup against the book, the batch and done words"""
+    from book_manager import add_words_to_book, get_words_from_book
+    (vocab_dir / 'merge.txt').write_text('apple\n', encoding='utf-8')
+    (vocab_dir / 'done.txt').write_text('banana\n', encoding='utf-8')
+    
+    result = add_words_to_book('merge', ['apple', 'banana', 'cherry', 'cherry', 'date'])
+    assert result == {'added': 2, 'duplicates': 2, 'already_done': 1}
+    assert get_words_from_book('merge') == ['apple', 'cherry', 'date']
+    
+    result = add_words_to_book('merge', ['banana'], skip_done=False)
+    assert result == {'added': 1, 'duplicates': 0, 'already_done': 0}
+
+def make_epub(path, chapters):
+    """Write a minimal EPUB with the given chapter bodies to path"""
+    import zipfile
+    manifest = ''.join(f'<item id="ch{i}" href="text/ch{i}.xhtml" media-type="application/xhtml+xml"/>'
+                       for i in range(len(chapters)))
+    spine = ''.join(f'<itemref idref="ch{i}"/>' for i in range(len(chapters)))
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('mimetype', 'application/epub+zip')
+        zf.writestr('META-INF/container.xml',
+                    '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+                    '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+                    '</rootfiles></container>')
+        zf.writestr('OEBPS/content.opf',
+                    '<package xmlns="http://www.idpf.org/2007/opf">'
+                    f'<manifest>{manifest}<item id="img" href="cover.jpg" media-type="image/jpeg"/></manifest>'
+                    f'<spine>{spine}</spine></package>')
+        zf.writestr('OEBPS/cover.jpg', b'\xff\xd8\xff')
+        for i, body in enumerate(chapters):
+            zf.writestr(f'OEBPS/text/ch{i}.xhtml', f'<html><body><p>{body}</p></body></html>')
+    return path
+
+def test_parse_epub_reads_spine_from_archive(tmp_path, monkeypatch):
+    """Test that EPUB chapters are read in spine order without extracting to disk"""
+    import zipfile
+    from epub_processor import parse_epub_file, get_content_paths
+    epub_path = make_epub(tmp_path / 'book.epub', ['The quick brown fox', 'jumps over the lazy dog'])
+    
+    with zipfile.ZipFile(epub_path) as zf:
+        assert get_content_paths(zf) == ['OEBPS/text/ch0.xhtml', 'OEBPS/text/ch1.xhtml']
+    
+    def fail_extract(*args, **kwargs):
+        raise AssertionError('EPUB should not be extracted to disk')
+    monkeypatch.setattr(zipfile.ZipFile, 'extractall', fail_extract)
+    assert parse_epub_file(str(epub_path)) == ['brown', 'dog', 'fox', 'jumps', 'lazy', 'over', 'quick', 'the']
+
+def test_extract_words_from_text_stream():
+    """Test that chunked extraction folds each chunk into one sorted vocabulary"""
+    from utils import extract_english_words, extract_english_words_from_texts
+    chunks = ["It's a well-known fact.", 'A FACT, well known', '']
+    assert extract_english_words_from_texts(iter(chunks)) == extract_english_words(' '.join(chunks))
+
+def test_parse_epub_parallel_matches_serial(tmp_path):
+    """Test that parsing chapters in a process pool gives the serial result"""
+    from epub_processor import parse_epub_file
+    epub_path = str(make_epub(tmp_path / 'book.epub',
+                              ['Once upon a time', 'there lived a king', 'in a far-away land']))
+    serial = parse_epub_file(epub_path, workers=1)
+    assert parse_epub_file(epub_path, workers=2, parallel_threshold=0) == serial
+    assert 'far-away' in serial
+    
+    # Chapters are read from the book only as the pool catches up
+    from concurrent.futures import ThreadPoolExecutor
+    from epub_processor import _map_bounded
+    pulled = []
+    with ThreadPoolExecutor(2) as pool:
+        results = _map_bounded(pool, lambda n: n * 2, (pulled.append(n) or n for n in range(10)), window=3)
+        assert next(results) == 0 and len(pulled) == 4
+        assert list(results) == list(range(2, 20, 2))
+
+@pytest.fixture
+def epub_dirs(tmp_path, monkeypatch):
+    """Point EPUB uploads, attachments and the extraction cache at temporary directories"""
+    import epub_processor
+    from disk_cache import DiskCache
+    for name in ('epub', 'attachment', 'cache'):
+        (tmp_path / name).mkdir()
+    monkeypatch.setattr(epub_processor, 'EPUB_DIR', str(tmp_path / 'epub'))
+    monkeypatch.setattr(epub_processor, 'ATTACHMENT_DIR', str(tmp_path / 'attachment'))
+    monkeypatch.setattr(epub_processor, '_epub_cache', DiskCache(str(tmp_path / 'cache'), 1024 * 1024))
+    return tmp_path
+
+def test_repeat_epub_upload_uses_cache(client, epub_dirs, tmp_path, monkeypatch):
+    """Test that uploading the same EPUB twice parses it once and reuses the attachment"""
+    import hashlib
+    import routes
+    from werkzeug.datastructures import FileStorage
+    from epub_processor import save_epub_file
+    calls = []
+    original_parse = routes.parse_epub_file
+    monkeypatch.setattr(routes, 'parse_epub_file',
+                        lambda path, **kwargs: calls.append(path) or original_parse(path, **kwargs))
+    epub_bytes = make_epub(tmp_path / 'source.epub', ['Reading is fun']).read_bytes()
+    
+    filenames = []
+    for upload_name in ('first.epub', 'second.epub'):
+        response = client.post('/api/upload-epub',
+                               data={'file': (io.BytesIO(epub_bytes), upload_name), 'sync': '1'},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['word_count'] == 3
+        filenames.append(data['filename'])
+    
+    assert len(calls) == 1
+    assert filenames[0] == filenames[1]
+    epub_hash = hashlib.sha256(epub_bytes).hexdigest()
+    assert os.listdir(epub_dirs / 'epub') == [f'{epub_hash}.epub']
+    
+    # A later upload with the same name does not replace a file awaiting its job
+    other_bytes = make_epub(tmp_path / 'other.epub', ['Zebra zoo']).read_bytes()
+    other_path, _ = save_epub_file(FileStorage(io.BytesIO(other_bytes), 'first.epub'),
+                                   hashlib.sha256(other_bytes).hexdigest())
+    assert original_parse(str(epub_dirs / 'epub' / f'{epub_hash}.epub')) == ['fun', 'is', 'reading']
+    assert original_parse(other_path) == ['zebra', 'zoo']
+
+def test_epub_to_book_import_filters(client, epub_dirs, vocab_dir, tmp_path):
+    """Test the occurrence and rank filters of EPUB imports, with counts cached for repeat uploads"""
+    import hashlib
+    (vocab_dir / 'filtered.txt').write_text('', encoding='utf-8')
+    epub_bytes = make_epub(tmp_path / 'source.epub', ['The habit, the blimp', 'A habit zzyzxq habit']).read_bytes()
+    
+    def upload(**fields):
+        return client.post('/api/epub-to-book',
+                           data={'file': (io.BytesIO(epub_bytes), 'habits.epub'), 'book_name': 'filtered',
+                                 'sync': '1', **fields},
+                           content_type='multipart/form-data')
+    
+    data = upload(min_count='2', common_rank='1000').get_json()
+    assert data['words'] == ['habit'] and data['word_count'] == 5
+    assert data['filtered_count'] == {'rare_in_text': 3, 'too_common': 1}
+    assert data['filters'] == {'min_count': 2, 'common_rank': 1000}
+    assert (vocab_dir / 'filtered.txt').read_text(encoding='utf-8') == 'habit\n'
+    
+    # Counts come from the cache, so the upload is not saved again
+    data = upload(min_count='3', vocab_size='2000').get_json()
+    assert data['words'] == ['habit'] and data['duplicate_count'] == 1
+    assert os.listdir(epub_dirs / 'epub') == [f'{hashlib.sha256(epub_bytes).hexdigest()}.epub']
+    data = upload().get_json()
+    assert data['new_word_count'] == 4 and 'filters' in data and not data['filters']
+    assert upload(min_count='-1').status_code == 400
+    
+    # Folded imports fold the done words too, so a done "habits" skips "habit"
+    (vocab_dir / 'done.txt').write_text('habits\n', encoding='utf-8')
+    (vocab_dir / 'folded.txt').write_text('', encoding='utf-8')
+    data = upload(book_name='folded', fold='1', common_rank='1000').get_json()
+    assert data['already_done_count'] == 1 and data['new_word_count'] == 2
+    assert 'habit' not in (vocab_dir / 'folded.txt').read_text(encoding='utf-8').split()
+
+@pytest.fixture
+def job_queue(tmp_path, monkeypatch):
+    """Run background jobs on a queue persisted to a temporary directory"""
+    import routes
+    from jobs import JobQueue
+    queue = JobQueue(str(tmp_path / 'jobs'), 1, 3600)
+    monkeypatch.setattr(routes, '_jobs', queue)
+    return queue
+
+def wait_for_job(client, status_url, timeout=10):
+    """Poll a job's status URL until it finishes"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = json.loads(client.get(status_url).data)['job']
+        if job['status'] in ('success', 'error'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError('Job did not finish in time')
+
+def test_epub_upload_runs_as_job(client, epub_dirs, job_queue, tmp_path):
+    """Test that an EPUB upload returns a job id and the job reports chapter progress and the result"""
+    epub_bytes = make_epub(tmp_path / 'source.epub', ['Reading is fun', 'Writing is too']).read_bytes()
+    response = client.post('/api/upload-epub',
+                           data={'file': (io.BytesIO(epub_bytes), 'book.epub')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    data = json.loads(response.data)
+    assert data['status_url'] == f"/api/jobs/{data['job_id']}"
+    
+    job = wait_for_job(client, data['status_url'])
+    assert job['status'] == 'success'
+    assert job['progress'] == {'done': 2, 'total': 2, 'unit': 'chapters'}
+    assert job['result']['word_count'] == 5
+    
+    # The finished job is served from its record on disk
+    assert job_queue.get(data['job_id']) == job
+    assert client.get('/api/jobs/missing').status_code == 404
+
+def test_interrupted_job_reports_error(job_queue):
+    """Test that a job left running by a process that has exited is reported as failed"""
+    with open(os.path.join(job_queue.directory, 'stale.json'), 'w') as f:
+        json.dump({'id': 'stale', 'status': 'running', 'pid': 2 ** 22 + 1}, f)
+    job = job_queue.get('stale')
+    assert job['status'] == 'error'
+    assert job['http_status'] == 500
+
+def test_vocab_test_words_are_memoized_without_touching_global_random():
+    """Test that session words are stable, copied per call and leave the global random state alone"""
+    import random
+    from vocab_count_test import get_test_words, NUM_BANDS
+    random.seed(42)
+    expected_next = random.random()
+    random.seed(42)
+    
+    words = get_test_words(2)
+    assert random.random() == expected_next
+    assert len(words) == 10 * NUM_BANDS
+    assert sorted({w['band'] for w in words}) == list(range(1, NUM_BANDS + 1))
+    
+    words[0]['word'] = 'changed'
+    assert get_test_words(2)[0]['word'] != 'changed'
+    assert get_test_words(2) == get_test_words(2) != get_test_words(3)
+
+def test_scoring_matches_original_formula(tmp_path):
+    """Test single and batch scoring against fixed results of the original formula, and rescoring stored results"""
+    from result_store import JsonResultStore
+    from vocab_assessment import VocabularyAssessment, LEVELS, score_tests
+    from vocab_count_test import calculate_vocab_size
+    submissions = []
+    for i in range(4):
+        words = [{'word': f'w{i}{j}', 'level': LEVELS[j % 4]} for j in range(12)]
+        answers = {word['word']: j % (i + 2) == 0 for j, word in enumerate(words)}
+        submissions.append(({'test_id': f't{i}', 'words': words}, answers))
+    
+    assessment = VocabularyAssessment(result_store=JsonResultStore(str(tmp_path)))
+    results = score_tests(submissions)
+    assert results == [assessment.calculate_score(*submission) for submission in submissions]
+    assert [(r['vocabulary_size'], r['cefr_level'], r['confidence']) for r in results] == \
+        [(2500, 'B1', 78), (2500, 'B1', 98), (500, 'A1', 86), (1200, 'A2', 97)]
+    assert results[0]['level_proportions'] == {'A1': 1.0, 'A2': 0.0, 'B1': 1.0, 'B2': 0.0, 'C1': 0, 'C2': 0}
+    
+    answers = {'s1': {'a': {'band': 1, 'known': True}, 'b': {'band': 1, 'known': True}, 'c': {'band': 1},
+                      'd': {'band': 1, 'known': False}, 'e': {'band': 3, 'known': True}},
+               's2': {'f': {'band': 3}, 'g': {'known': False}}}
+    assert calculate_vocab_size(answers) == {'total_vocab_size': 5400, 'band_results': [
+        {'band': 1, 'range': '1-6000', 'tested': 5, 'known': 2, 'percentage': 40.0, 'estimated_known': 2400},
+        {'band': 3, 'range': '12001-18000', 'tested': 2, 'known': 1, 'percentage': 50.0, 'estimated_known': 3000}]}
+    
+    for result in results[:2]:
+        assessment.save_result('ann', dict(result, vocabulary_size=1))
+    assert assessment.rescore_stored_results() == {'users': 1, 'results': 2, 'changed': 2}
+    history = assessment.get_user_history('ann')['results']
+    assert [r['vocabulary_size'] for r in history] == [r['vocabulary_size'] for r in results[:2]]
+    assert assessment.rescore_stored_results()['changed'] == 0
+
+def test_coca_index_lookups_and_rebuild(tmp_path):
+    """Test rank and word lookups on a compiled index, including blanks, duplicates and rebuilds"""
+    from coca_index import open_index, index_path
+    list_path = tmp_path / 'words.txt'
+    list_path.write_text('the\nof\n\nand\ncafé\nof\n', encoding='utf-8')
+    
+    index = open_index(str(list_path))
+    assert len(index) == 4 and index.max_rank == 6
+    assert [index.rank_of(w) for w in ('the', 'of', 'and', 'café', 'zebra')] == [1, 2, 4, 5, None]
+    assert index.rank_of_many(['zebra', 'of', 'a', 'café', 'the', 'of', '']) == [None, 2, None, 5, 1, 2, None]
+    assert [index.word_at(r) for r in (0, 1, 3, 5, 6, 7)] == [None, 'the', None, 'café', 'of', None]
+    assert list(index.ranks()) == [1, 2, 4, 5, 6]
+    assert list(index.iter_sorted()) == [('and', 4), ('café', 5), ('of', 2), ('the', 1)]
+    
+    list_path.write_text('zebra\n', encoding='utf-8')
+    os.utime(index_path(str(list_path)), ns=(1, 1))
+    assert open_index(str(list_path)).rank_of('zebra') == 1
+
+def test_lemma_table_folds_unlisted_inflections(tmp_path, vocab_dir):
+    """Test that regular inflections fold to listed lemmas while listed forms stay separate"""
+    from lemma_table import open_lemma_table
+    from utils import extract_english_words
+    from book_manager import add_words_to_book, get_words_from_book
+    list_path = tmp_path / 'words.txt'
+    list_path.write_text('new\nhabit\nmake\nmaking\nbox\nstudy\nnews\ngrab\nnot\nfor\ncar\nstar\n'
+                         'visit\nnote\ncare\nstare\n', encoding='utf-8')
+    
+    table = open_lemma_table(str(list_path))
+    assert [table.lemma_of(w) for w in ('habits', 'makes', 'boxes', 'studies', 'grabbed', 'grabbing')] == \
+        ['habit', 'make', 'box', 'study', 'grab', 'grab']
+    assert [table.lemma_of(w) for w in ('making', 'news', 'habit', 'habitual')] == [None] * 4
+    # Silent-e lemmas win over their one-syllable twins, which only double
+    assert [table.lemma_of(w) for w in ('noting', 'cared', 'stared', 'starred', 'visited', 'visitted')] == \
+        ['note', 'care', 'stare', 'star', 'visit', None]
+    assert [table.lemma_of(w) for w in ('nots', 'fors', 'notted')] == [None] * 3
+    
+    assert extract_english_words('Habits: the habit of boxes', fold=True) == ['box', 'habit', 'of', 'the']
+    assert extract_english_words('Habits habit habits', counts=True, fold=True) == {'habit': 3}
+    add_words_to_book('folded', ['habit'])
+    result = add_words_to_book('folded', ['habits', 'boxes', 'box'], fold=True)
+    assert result == {'added': 1, 'duplicates': 2, 'already_done': 0}
+    assert get_words_from_book('folded') == ['habit', 'box']
+    
+    # Done words fold too, so a done "boxes" covers "box"
+    add_words_to_book('done', ['boxes'])
+    assert add_words_to_book('other', ['boxes', 'box'], fold=True) == {'added': 0, 'duplicates': 1, 'already_done': 1}
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    """Test that the disk cache drops the least recently used entry when full"""
+    from disk_cache import DiskCache
+    cache = DiskCache(str(tmp_path), max_bytes=10 ** 6)
+    cache.set('a', list(range(100)))
+    cache.set('b', list(range(100)))
+    entry_size = os.path.getsize(cache._path('a'))
+    os.utime(cache._path('a'), ns=(1, 1))
+    os.utime(cache._path('b'), ns=(2, 2))
+    assert cache.get('a') == list(range(100))  # touches 'a'
+    
+    cache.max_bytes = entry_size * 2
+    cache.set('c', [])
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') == []
+
+def test_tokenizer_matches_legacy_extraction():
+    """Test that the tokenizer gives the same words as the original regex, plus counts"""
+    import re
+    from tokenizer import extract_words, iter_words, WordCollector
+    text = "It's a WELL-known fact: the Kelvin sign K and İ don't create words. The end-"
+    legacy = sorted({w.lower() for w in re.findall(r"\b[a-zA-Z]+-?[a-zA-Z]*'?[a-zA-Z]*\b", text)})
+    
+    assert extract_words(text) == legacy
+    assert sorted(set(iter_words(text))) == legacy
+    counts = extract_words(text, counts=True)
+    assert counts['the'] == 2 and counts['well-known'] == 1
+    
+    collector = WordCollector(counts=True)
+    for chunk in text.split(':'):
+        collector.add(chunk)
+    assert collector.result() == counts
+
+@pytest.mark.parametrize('backend', ['lxml', 'bs4'])
+def test_extract_text_skips_script_style_nav(backend):
+    """Test that both HTML text backends drop non-readable elements"""
+    from html_text import extract_text
+    from utils import extract_english_words
+    page = ('<html><head><title>Title</title>\n<style>body { color: red }</style></head>'
+            '<body><nav>Home About</nav><p>Café visitors <!-- hidden --> read</p>\n'
+            '<script>var tracking = true;</script>daily</body></html>')
+    expected = ['daily', 'read', 'title', 'visitors']
+    assert extract_english_words(extract_text(page, backend)) == expected
+    assert extract_english_words(extract_text(page.encode('utf-8'), backend)) == expected
+
+@pytest.fixture
+def http_server():
+    """Serve a few fixed pages from a local HTTP server on a background thread"""
+    import threading
+    from types import SimpleNamespace
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    pages = {
+        '/one': b'<html><body><p>Alpha beta</p><script>ignored()</script></body></html>',
+        '/two': b'<html><body><p>Beta gamma</p></body></html>'
+    }
+    seen = []
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append((self.path, self.headers.get('If-None-Match')))
+            body = pages.get(self.path)
+            if body and self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200 if body else 404)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body or b'')))
+            if body:
+                self.send_header('ETag', '"v1"')
+            self.end_headers()
+            self.wfile.write(body or b'')
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield SimpleNamespace(url=f'http://127.0.0.1:{server.server_address[1]}', requests=seen)
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def web_dirs(tmp_path, monkeypatch):
+    """Point webpage attachments and the page cache at temporary directories"""
+    import web_extractor
+    from disk_cache import DiskCache
+    monkeypatch.setattr(web_extractor, 'ATTACHMENT_DIR', str(tmp_path))
+    monkeypatch.setattr(web_extractor, '_page_cache', DiskCache(str(tmp_path / 'web_cache'), 1024 * 1024, ttl=60))
+    return tmp_path
+
+def test_extract_webpages_concurrently(client, http_server, vocab_dir, web_dirs):
+    """Test that several pages are fetched, merged and reported per URL"""
+    (vocab_dir / 'reading.txt').write_text('alpha\n', encoding='utf-8')
+    
+    urls = [f'{http_server.url}/one', f'{http_server.url}/two', f'{http_server.url}/missing']
+    response = client.post('/api/extract-webpages', json={'urls': urls, 'book_name': 'reading'})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['words'] == ['alpha', 'beta', 'gamma']
+    assert [r['status'] for r in data['results']] == ['success', 'success', 'error']
+    assert all(r['elapsed_ms'] >= 0 for r in data['results'])
+    assert data['new_word_count'] == 2 and data['duplicate_count'] == 1
+    assert (web_dirs / data['filename']).read_text(encoding='utf-8') == 'alpha\nbeta\ngamma\n'
+
+def test_webpage_cache_revalidates_with_etag(http_server, web_dirs, monkeypatch):
+    """Test that a cached page is revalidated and reused without parsing on 304"""
+    import web_extractor
+    url = f'{http_server.url}/one'
+    assert web_extractor.extract_words_from_webpage(url) == ['alpha', 'beta']
+    
+    def fail_read(response, *args):
+        raise AssertionError('a 304 response should not be parsed')
+    monkeypatch.setattr(web_extractor, 'read_response_words', fail_read)
+    result = web_extractor.extract_words_from_webpages([url])
+    assert result['words'] == ['alpha', 'beta']
+    assert result['results'][0]['cache'] == 'revalidated'
+    assert http_server.requests == [('/one', None), ('/one', '"v1"')]
+
+def test_extract_to_book_counts_occurrences_for_min_count(client, http_server, vocab_dir, web_dirs):
+    """Test that min_count refetches a page cached without counts and then revalidates it"""
+    import web_extractor
+    url = f'{http_server.url}/one'
+    (vocab_dir / 'counted.txt').write_text('', encoding='utf-8')
+    assert web_extractor.extract_words_from_webpage(url) == ['alpha', 'beta']
+    
+    for expected_etag in (None, '"v1"'):
+        data = client.post('/api/extract-to-book',
+                           data={'url': url, 'book_name': 'counted', 'min_count': '2', 'sync': '1'}).get_json()
+        assert data['words'] == [] and data['filtered_count']['rare_in_text'] == 2
+        assert http_server.requests[-1] == ('/one', expected_etag)
+
+def test_streamed_page_extraction_cutoffs(http_server, web_dirs, monkeypatch):
+    """Test that streamed pages honor the byte cutoff, the target word count and the bs4 backend"""
+    import web_extractor
+    url = f'{http_server.url}/one'
+    words, info = web_extractor._fetch_page_words(url, max_bytes=20)
+    assert words == ['alpha'] and info['truncated'] and info['bytes_read'] == 20
+    
+    words, info = web_extractor._fetch_page_words(url, target_words=1)
+    assert info['truncated'] and len(words) >= 1
+    
+    words, info = web_extractor._fetch_page_words(url)
+    assert words == ['alpha', 'beta'] and not info['truncated']
+    
+    import html_text
+    monkeypatch.setattr(html_text, 'HTML_TEXT_BACKEND', 'bs4')
+    assert isinstance(html_text.create_text_extractor(), html_text.BufferedTextExtractor)
+    words, info = web_extractor._fetch_page_words(url)
+    assert words == ['alpha', 'beta'] and not info['truncated']
+
+def test_streaming_text_extractor_matches_whole_document():
+    """Test that feeding HTML in pieces gives the same words as parsing it whole"""
+    from html_text import extract_text, StreamingTextExtractor, BufferedTextExtractor
+    from tokenizer import WordCollector
+    from utils import extract_english_words
+    page = ('<html><head><style>p { color: red }</style></head><body><p>Streaming '
+            'well-known <script>if (a < b) { run() }</script> parsers don\'t split words</p></body></html>')
+    expected = extract_english_words(extract_text(page))
+    
+    for size in (1, 3, 7, 64):
+        extractor = StreamingTextExtractor()
+        collector = WordCollector()
+        for i in range(0, len(page), size):
+            collector.feed(extractor.feed(page[i:i + size]))
+        collector.feed(extractor.close())
+        assert collector.result() == expected
+    
+    extractor = BufferedTextExtractor('bs4')
+    assert [extractor.feed(page[i:i + 7]) for i in range(0, len(page), 7)] == [''] * len(range(0, len(page), 7))
+    assert extract_english_words(extractor.close()) == extract_english_words(extract_text(page, 'bs4'))
@@ -0,0 +1,138 @@
+"""
+English Word Tokenizer
+
+This module extracts English words from text with a single precompiled
+pattern. Words may contain one hyphen and one apostrophe (e.g. "well-known",
+"it's") and are always returned in lowercase.
+
+The text is lowercased once up front rather than word by word, and the
+tokens can be consumed in several ways:
+1. iter_words - lazily yields each occurrence via finditer
+2. extract_words - sorted unique words, or a Counter of occurrences
+3. WordCollector - folds a stream of text chunks into one vocabulary, either
+   whole texts (add) or arbitrary pieces of one text (feed)
+"""
+
+import re
+from collections import Counter
+
+# Regular expression to match English words
+# Including contractions and hyphenated words
+WORD_PATTERN = re.compile(r"\b[a-zA-Z]+-?[a-zA-Z]*'?[a-zA-Z]*\b")
+
+# Characters whose lowercase form contains ASCII letters. Lowercasing text
+# that contains them could create new matches, so such text is matched first
+# and lowercased word by word instead.
+_CASE_UNSAFE_CHARS = ('\u0130', '\u212a')
+
+def _lower_for_matching(text):
+    """Lowercase text up front if doing so cannot change what the pattern matches"""
+    if any(char in text for char in _CASE_UNSAFE_CHARS):
+        return None
+    return text.lower()
+
+def find_words(text):
+    """
+    Find every English word occurrence in text
+    
+    Args:
+        text (str): Text to tokenize
+        
+    Returns:
+        list: Lowercase words in the order they appear
+    """
+    lowered = _lower_for_matching(text)
+    if lowered is None:
+        return [word.lower() for word in WORD_PATTERN.findall(text)]
+    return WORD_PATTERN.findall(lowered)
+
+def iter_words(text):
+    """
+    Yield each English word occurrence in text, lowercased, as it is matched
+    
+    Args:
+        text (str): Text to tokenize
+        
+    Yields:
+        str: Lowercase words in the order they appear
+    """
+    lowered = _lower_for_matching(text)
+    if lowered is None:
+        for match in WORD_PATTERN.finditer(text):
+            yield match.group().lower()
+    else:
+        for match in WORD_PATTERN.finditer(lowered):
+            yield match.group()
+
+def extract_words(text, counts=False):
+    """
+    Extract English words from text
+    
+    Args:
+        text (str): Text to tokenize
+        counts (bool): Return a Counter of occurrences instead of a list
+        
+    Returns:
+        list or Counter: Sorted unique lowercase words, or lowercase words
+                         mapped to the number of times they occur
+    """
+    if counts:
+        return Counter(find_words(text))
+    return sorted(set(find_words(text)))
+
+class WordCollector:
+    """Accumulates the vocabulary of a stream of text chunks"""
+    
+    def __init__(self, counts=False):
+        """
+        Initialize the collector
+        
+        Args:
+            counts (bool): Track occurrence counts instead of just unique words
+        """
+        self.counts = counts
+        self._words = Counter() if counts else set()
+        self._pending = ''
+    
+    def add(self, text):
+        """Tokenize a chunk of text and fold it into the vocabulary"""
+        self._words.update(find_words(text))
+    
+    def feed(self, text):
+        """
+        Tokenize the next piece of a text that arrives in arbitrary pieces
+        
+        A word may be split across pieces, so everything after the last
+        character that can never touch a match is held back until more text
+        arrives or flush is called.
+        """
+        text = self._pending + text
+        end = len(text)
+        while end > 0 and (text[end - 1].isalnum() or text[end - 1] in "_'-"):
+            end -= 1
+        self._pending = text[end:]
+        if end:
+            self.add(text[:end])
+    
+    def flush(self):
+        """Tokenize any text held back by feed"""
+        if self._pending:
+            self.add(self._pending)
+            self._pending = ''
+    
+    def __len__(self):
+        """Number of unique words collected so far"""
+        return len(self._words)
+    
+    def result(self):
+        """
+        Get the collected vocabulary
+        
+        Returns:
+            list or Counter: Sorted unique lowercase words, or a Counter of
+                             lowercase words when counting
+        """
+        self.flush()
+        if self.counts:
+            return Counter(self._words)
+        return sorted(self._words)
@@ -1,6 +1,7 @@
 import os
-import re
 from werkzeug.utils import secure_filename
+from tokenizer import extract_words, WordCollector
+from lemma_table import fold_inflections
 
 # Configuration constants
 def get_app_dirs():
@@ -8,7 +9,9 @@ def get_app_dirs():
     return {
         'VOCAB_DIR': os.path.join(base_dir, 'vocabulary_books'),
         'ATTACHMENT_DIR': os.path.join(base_dir, 'attachment'),
-        'EPUB_DIR': os.path.join(base_dir, 'epub')
+        'EPUB_DIR': os.path.join(base_dir, 'epub'),
+        'CACHE_DIR': os.path.join(base_dir, 'cache'),
+        'JOBS_DIR': os.path.join(base_dir, 'jobs')
     }
 
 # Create necessary directories
@@ -22,6 +25,56 @@ def create_directories():
 ALLOWED_EXTENSIONS = {'epub'}
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload size
 
+# EPUB parsing settings
+# Number of worker processes used to parse chapters in parallel (1 = serial)
+EPUB_POOL_SIZE = int(os.environ.get('EPUB_POOL_SIZE', '1'))
+# Books with fewer chapters than this are always parsed serially
+EPUB_PARALLEL_THRESHOLD = int(os.environ.get('EPUB_PARALLEL_THRESHOLD', '8'))
+# Disk space for cached EPUB extraction results, keyed by file hash
+EPUB_CACHE_MAX_BYTES = int(os.environ.get('EPUB_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# HTML text extraction backend: 'lxml' (fast) or 'bs4' (BeautifulSoup fallback)
+HTML_TEXT_BACKEND = os.environ.get('HTML_TEXT_BACKEND', 'lxml')
+
+# Webpage fetching settings
+# Seconds to wait for a webpage before giving up
+WEB_FETCH_TIMEOUT = float(os.environ.get('WEB_FETCH_TIMEOUT', '10'))
+# Connections kept open per host by the shared HTTP session
+WEB_POOL_SIZE = int(os.environ.get('WEB_POOL_SIZE', '16'))
+# Threads used to fetch the pages of a multi-URL extraction concurrently
+WEB_FETCH_WORKERS = int(os.environ.get('WEB_FETCH_WORKERS', '8'))
+# Webpage bodies are read in chunks of this size and cut off after WEB_MAX_BYTES
+WEB_CHUNK_SIZE = int(os.environ.get('WEB_CHUNK_SIZE', str(64 * 1024)))
+WEB_MAX_BYTES = int(os.environ.get('WEB_MAX_BYTES', str(5 * 1024 * 1024)))
+# Seconds a cached webpage is kept and revalidated instead of refetched (0 disables the cache)
+WEB_CACHE_TTL = float(os.environ.get('WEB_CACHE_TTL', str(24 * 60 * 60)))
+# Disk space for cached webpage extraction results
+WEB_CACHE_MAX_BYTES = int(os.environ.get('WEB_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# Maximum number of URLs accepted in one multi-URL extraction
+MAX_URLS_PER_REQUEST = int(os.environ.get('MAX_URLS_PER_REQUEST', '50'))
+
+# Storage settings
+# Where books, done words and assessment results live: 'files' or 'sqlite'
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'files')
+# Database file used by the sqlite backend
+SQLITE_DB_PATH = os.environ.get('SQLITE_DB_PATH',
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wordbook.db'))
+
+# Size in bytes at which a book's operation log is folded into its .txt snapshot
+BOOK_LOG_COMPACT_BYTES = int(os.environ.get('BOOK_LOG_COMPACT_BYTES', str(64 * 1024)))
+
+# Response compression settings
+# JSON responses at least this large are compressed when the client accepts it
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+# gzip level (1-9) or brotli quality (0-11)
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', '6'))
+
+# Background job settings
+# Worker threads running extraction jobs
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+# Seconds job records are kept on disk before they are pruned
+JOB_RETENTION = float(os.environ.get('JOB_RETENTION', str(24 * 60 * 60)))
+
 def allowed_file(filename):
     """Check if the file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -33,17 +86,39 @@ def get_timestamp_filename(base_name, extension):
     safe_name = secure_filename(base_name)
     return f"{safe_name}_{timestamp}.{extension}"
 
-def extract_english_words(text):
-    """Extract English words from text"""
-    # Regular expression to match English words
-    # Including contractions and hyphenated words
-    pattern = r'\b[a-zA-Z]+-?[a-zA-Z]*\'?[a-zA-Z]*\b'
-    words = re.findall(pattern, text)
+def extract_english_words(text, counts=False, fold=False):
+    """
+    Extract English words from text
     
-    # Convert to lowercase and remove duplicates
-    unique_words = list(set([word.lower() for word in words]))
+    Args:
+        text (str): Text to tokenize
+        counts (bool): Return a Counter of occurrences instead of a list
+        fold (bool): Fold regular inflections to their lemma ("habits" -> "habit")
+        
+    Returns:
+        list or Counter: Sorted unique lowercase words, or their counts
+    """
+    words = extract_words(text, counts=counts)
+    return fold_inflections(words) if fold else words
+
+def extract_english_words_from_texts(texts, counts=False, fold=False):
+    """
+    Extract English words from a stream of text chunks
     
-    # Sort the words alphabetically
-    unique_words.sort()
+    Each chunk is tokenized as soon as it is produced and folded into a running
+    set, so only one chunk and the vocabulary are held in memory at a time.
+    Words never span two chunks.
     
-    return unique_words
+    Args:
+        texts (iterable): Text chunks, e.g. a generator of chapter texts
+        counts (bool): Return a Counter of occurrences instead of a list
+        fold (bool): Fold regular inflections to their lemma ("habits" -> "habit")
+        
+    Returns:
+        list or Counter: Sorted unique lowercase words, or their counts
+    """
+    collector = WordCollector(counts=counts)
+    for text in texts:
+        collector.add(text)
+    words = collector.result()
+    return fold_inflections(words) if fold else words
@@ -11,13 +11,27 @@ through different testing methodologies:
 
 The assessment can be completed quickly (5-10 minutes) and taken multiple times
 to improve accuracy through averaging results.
+
+A single submission is scored with plain loops (calculate_score). Batches are
+vectorized with NumPy: every tested word becomes a level index and a known
+flag in flat arrays, and np.bincount gives the per-level counts of all
+submissions in one pass (see score_tests). Stored results keep their level
+proportions, so they can all be scored again after the formula changes:
+
+    python3 vocab_assessment.py rescore [--user USER_ID ...]
 """
 
 import random
 import json
 import os
 import math
+import time
+import argparse
+import numpy as np
+from itertools import chain
+from operator import itemgetter
 from utils import get_app_dirs
+from storage import create_result_store
 
 # Get directory paths
 DIRS = get_app_dirs()
@@ -26,6 +40,9 @@ DIRS = get_app_dirs()
 ASSESSMENT_DIR = os.path.join(DIRS.get('APP_DIR', ''), 'assessment_data')
 os.makedirs(ASSESSMENT_DIR, exist_ok=True)
 
+# Per-user assessment results (used by the files storage backend)
+USER_RESULTS_DIR = os.path.join(ASSESSMENT_DIR, 'user_results')
+
 # Dictionary of CEFR levels with approximate vocabulary sizes
 VOCAB_LEVELS = {
     'A1': 500,     # Beginner
@@ -36,6 +53,10 @@ VOCAB_LEVELS = {
     'C2': 16000    # Proficient
 }
 
+# CEFR levels in order of difficulty, and the index of each
+LEVELS = list(VOCAB_LEVELS)
+LEVEL_INDEX = {level: i for i, level in enumerate(LEVELS)}
+
 # Path to word frequency lists
 WORD_LISTS_PATH = os.path.join(ASSESSMENT_DIR, 'frequency_lists')
 os.makedirs(WORD_LISTS_PATH, exist_ok=True)
@@ -43,9 +64,15 @@ os.makedirs(WORD_LISTS_PATH, exist_ok=True)
 class VocabularyAssessment:
     """Class for managing vocabulary assessment tests"""
     
-    def __init__(self):
-        """Initialize the vocabulary assessment module"""
+    def __init__(self, result_store=None):
+        """
+        Initialize the vocabulary assessment module
+        
+        Args:
+            result_store: Store for user results, defaults to the configured backend
+        """
         self.word_frequency_data = {}
+        self.result_store = result_store or create_result_store(USER_RESULTS_DIR)
         self.load_word_frequency_data()
         
     def load_word_frequency_data(self):
@@ -143,6 +170,9 @@ class VocabularyAssessment:
         """
         Calculate vocabulary size and CEFR level based on test answers
         
+        Scores one submission with plain loops; score_tests computes the same
+        results for many submissions at once.
+        
         Args:
             test_data (dict): The test data including words and their levels
             answers (dict): Dictionary mapping words to True (known) or False (unknown)
@@ -208,23 +238,24 @@ class VocabularyAssessment:
         Returns:
             bool: Success status
         """
-        user_results_dir = os.path.join(ASSESSMENT_DIR, 'user_results')
-        os.makedirs(user_results_dir, exist_ok=True)
-        
-        user_file = os.path.join(user_results_dir, f'{user_id}.json')
-        
-        # Load existing results or create new
-        if os.path.exists(user_file):
-            with open(user_file, 'r') as f:
-                user_data = json.load(f)
-        else:
-            user_data = {'results': []}
-        
         # Add timestamp to result
-        result['timestamp'] = os.path.getmtime(user_file) if os.path.exists(user_file) else 0
+        result['timestamp'] = time.time()
         
-        # Add new result
-        user_data['results'].append(result)
+        self.result_store.add_result(user_id, result)
+        return True
+    
+    def get_user_history(self, user_id):
+        """
+        Get assessment history for a user
+        
+        Args:
+            user_id (str): Identifier for the user
+            
+        Returns:
+            dict: User's assessment results plus their average vocabulary
+                  size and CEFR level over the last 3 tests
+        """
+        user_data = {'results': self.result_store.get_results(user_id)}
         
         # Calculate average score from last 3 tests
         recent_results = user_data['results'][-3:]
@@ -241,30 +272,157 @@ class VocabularyAssessment:
             avg_level_idx = round(avg_level_idx / len(recent_results))
             user_data['average_cefr_level'] = levels[min(avg_level_idx, len(levels) - 1)]
         
-        # Save updated data
-        with open(user_file, 'w') as f:
-            json.dump(user_data, f)
-        
-        return True
+        return user_data
     
-    def get_user_history(self, user_id):
+    def rescore_stored_results(self, user_ids=None):
         """
-        Get assessment history for a user
+        Score stored results again with the current formula
+        
+        The results of all users are scored together in one vectorized batch.
         
         Args:
-            user_id (str): Identifier for the user
+            user_ids (list): Users to rescore, defaults to every user
             
         Returns:
-            dict: User's assessment history
+            dict: Number of 'users' and 'results' rescored, and how many
+                  results 'changed'
         """
-        user_results_dir = os.path.join(ASSESSMENT_DIR, 'user_results')
-        user_file = os.path.join(user_results_dir, f'{user_id}.json')
+        user_ids = self.result_store.list_users() if user_ids is None else user_ids
+        stored = {user_id: self.result_store.get_results(user_id) for user_id in user_ids}
+        batch = [result for results in stored.values() for result in results]
+        rescored = iter(rescore_results(batch))
         
-        if os.path.exists(user_file):
-            with open(user_file, 'r') as f:
-                return json.load(f)
-        else:
-            return {'results': []}
+        changed = 0
+        for user_id, results in stored.items():
+            if not results:
+                continue
+            new_results = [next(rescored) for _ in results]
+            if new_results != results:
+                changed += sum(new != old for new, old in zip(new_results, results))
+                self.result_store.replace_results(user_id, new_results)
+        
+        return {'users': len(stored), 'results': len(batch), 'changed': changed}
+
+# Vectorized scoring
+def count_levels(submissions):
+    """
+    Count tested and known words per level for many submissions
+    
+    Args:
+        submissions (list): (test_data, answers) pairs, where test_data['words']
+                            holds {'word', 'level'} dicts and answers maps
+                            words to True (known) or False (unknown)
+        
+    Returns:
+        tuple: (tested, known) integer arrays of shape (submissions, levels)
+    """
+    word_counts = [len(test_data['words']) for test_data, _ in submissions]
+    total = sum(word_counts)
+    get_word, get_level = itemgetter('word'), itemgetter('level')
+    level_index = np.fromiter(chain.from_iterable(map(LEVEL_INDEX.__getitem__, map(get_level, test_data['words']))
+                                                  for test_data, _ in submissions), dtype=np.intp, count=total)
+    known_flags = np.fromiter(chain.from_iterable(map(answers.get, map(get_word, test_data['words']))
+                                                  for test_data, answers in submissions), dtype=bool, count=total)
+    
+    # One bincount cell per (submission, level)
+    cells = np.repeat(np.arange(len(submissions), dtype=np.intp) * len(LEVELS), word_counts) + level_index
+    size = len(submissions) * len(LEVELS)
+    tested = np.bincount(cells, minlength=size)
+    known = np.bincount(cells[known_flags], minlength=size)
+    return tested.reshape(-1, len(LEVELS)), known.reshape(-1, len(LEVELS))
+
+def score_proportions(proportions):
+    """
+    Score submissions from the share of words known at each level
+    
+    Sums run level by level in VOCAB_LEVELS order, as the original
+    per-submission loop did, so the results match it exactly.
+    
+    Args:
+        proportions (ndarray): Float array of shape (submissions, levels)
+        
+    Returns:
+        tuple: Arrays of vocabulary sizes (rounded to 100), CEFR level
+               indexes and confidence percentages, one entry per submission
+    """
+    count = proportions.shape[0]
+    columns = proportions.T
+    level_sizes = np.array(list(VOCAB_LEVELS.values()))
+    
+    # Estimate vocabulary size based on proportion known at each level
+    vocabulary_size = np.zeros(count)
+    for level_size, column in zip(VOCAB_LEVELS.values(), columns):
+        vocabulary_size += level_size * column
+    vocabulary_size = np.round(vocabulary_size / 100) * 100
+    
+    # Highest level with 80% of its vocabulary known, A1 if none
+    reached = vocabulary_size[:, None] >= level_sizes * 0.8
+    level_index = np.where(reached.any(axis=1), len(LEVELS) - 1 - np.argmax(reached[:, ::-1], axis=1), 0)
+    
+    # Confidence is higher with more consistent results across levels
+    total = np.zeros(count)
+    for column in columns:
+        total += column
+    mean = total / len(LEVELS)
+    variance = np.zeros(count)
+    for column in columns:
+        variance += (column - mean) ** 2
+    variance /= len(LEVELS)
+    confidence = np.clip(100 - (variance * 100), 0, 100)
+    
+    return vocabulary_size.astype(int), level_index, np.round(confidence).astype(int)
+
+def _build_results(scores, level_proportions, test_ids):
+    """Assemble result dicts from the arrays returned by score_proportions"""
+    vocabulary_size, level_index, confidence = scores
+    return [{
+        'vocabulary_size': int(vocabulary_size[i]),
+        'cefr_level': LEVELS[level_index[i]],
+        'level_proportions': level_proportions[i],
+        'confidence': int(confidence[i]),
+        'test_id': test_ids[i]
+    } for i in range(len(test_ids))]
+
+def score_tests(submissions):
+    """
+    Calculate vocabulary size and CEFR level for many submissions at once
+    
+    Args:
+        submissions (list): (test_data, answers) pairs, as for count_levels
+        
+    Returns:
+        list: One result per submission with 'vocabulary_size', 'cefr_level',
+              'level_proportions', 'confidence' and 'test_id'
+    """
+    tested, known = count_levels(submissions)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        proportions = np.where(tested > 0, known / tested, 0.0)
+    
+    # Levels without tested words report a proportion of 0
+    level_proportions = [{level: proportion if level_tested else 0
+                          for level, proportion, level_tested in zip(LEVELS, row, tested_row)}
+                         for row, tested_row in zip(proportions.tolist(), tested.tolist())]
+    return _build_results(score_proportions(proportions), level_proportions,
+                          [test_data['test_id'] for test_data, _ in submissions])
+
+def rescore_results(results):
+    """
+    Score stored results again from their level proportions
+    
+    Args:
+        results (list): Results as returned by score_tests, possibly with
+                        extra fields such as 'timestamp'
+        
+    Returns:
+        list: Copies of the results with 'vocabulary_size', 'cefr_level' and
+              'confidence' recomputed
+    """
+    level_proportions = [result.get('level_proportions', {}) for result in results]
+    proportions = np.array([[proportions.get(level, 0) for level in LEVELS] for proportions in level_proportions],
+                           dtype=float).reshape(-1, len(LEVELS))
+    scored = _build_results(score_proportions(proportions), level_proportions,
+                            [result.get('test_id') for result in results])
+    return [{**result, **score} for result, score in zip(results, scored)]
 
 # Function to generate an adaptive test that adjusts difficulty based on responses
 def generate_adaptive_test(assessment, initial_level='B1', max_questions=25):
@@ -356,3 +514,14 @@ def get_next_adaptive_question(assessment, test_state, previous_result):
     test_state['current_level_idx'] = current_level_idx
     
     return test_state
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score stored vocabulary assessment results again')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    rescore_parser = subparsers.add_parser('rescore', help='Recompute every stored result with the current formula')
+    rescore_parser.add_argument('--user', action='append', dest='users',
+                                help='Only rescore this user (can be repeated)')
+    args = parser.parse_args()
+    
+    counts = VocabularyAssessment().rescore_stored_results(args.users)
+    print(f"Rescored {counts['results']} results of {counts['users']} users, {counts['changed']} changed")
@@ -15,7 +15,9 @@ import os
 import random
 import json
 import math
+from array import array
 from utils import get_app_dirs
+from coca_index import open_index
 
 # Get directory paths
 DIRS = get_app_dirs()
@@ -34,13 +36,42 @@ TOTAL_WORDS = 60000
 # Words per band (assuming equal distribution)
 WORDS_PER_BAND = TOTAL_WORDS // NUM_BANDS
 
+# Memory-mapped index of the word list, opened on first use
+_coca_index = None
+
 # Cache for the loaded word list
 _word_list = None
 
+# Ranks of the words in each band, built once from the index
+_band_positions = None
+
+# Selected test words per (session, words_per_band)
+_session_words = {}
+
+def get_coca_index():
+    """
+    Get the memory-mapped COCA index, building it on first use if needed
+    
+    Returns:
+        CocaIndex: The index, or None if the word list is missing or unreadable
+    """
+    global _coca_index
+    
+    if _coca_index is None:
+        try:
+            _coca_index = open_index(COCA_FILE)
+        except Exception as e:
+            print(f"Error opening COCA index: {e}")
+    
+    return _coca_index
+
 def load_word_list():
     """
     Load the COCA word frequency list
     
+    The test itself reads the memory-mapped index; this full list of dicts is
+    only built for callers that ask for it.
+    
     Returns:
         list: List of words with their frequency rank
     """
@@ -49,17 +80,8 @@ def load_word_list():
     if _word_list is not None:
         return _word_list
     
-    words = []
-    
-    if os.path.exists(COCA_FILE):
-        with open(COCA_FILE, 'r') as f:
-            for i, line in enumerate(f):
-                word = line.strip()
-                if word:  # Skip empty lines
-                    words.append({
-                        'word': word,
-                        'rank': i + 1  # 1-based ranking
-                    })
+    index = get_coca_index()
+    words = [{'word': word, 'rank': rank} for rank, word in index.iter_ranked()] if index else []
     
     _word_list = words
     return words
@@ -95,61 +117,91 @@ def get_band_range(band):
     end_rank = band * WORDS_PER_BAND
     return (start_rank, end_rank)
 
-def get_test_words(session, words_per_band=10):
+def get_band_positions():
     """
-    Generate a set of test words for a specific test session
+    Partition the word list into frequency bands
+    
+    The partition is computed on first use and kept for the life of the process.
     
-    Args:
-        session (int): Test session number (1-3)
-        words_per_band (int): Number of words to select from each band
-        
     Returns:
-        list: Selected test words with rank and band information
+        dict: Band number (1-10) -> array of the ranks of the words in the band
     """
-    word_list = load_word_list()
-    if not word_list:
-        return []
+    global _band_positions
     
-    # Divide words into bands
-    bands = {}
-    for word_data in word_list:
-        rank = word_data['rank']
-        band = get_frequency_band(rank)
-        
-        if band not in bands:
-            bands[band] = []
-        
-        bands[band].append(word_data)
+    if _band_positions is None:
+        positions = {band: array('I') for band in range(1, NUM_BANDS + 1)}
+        index = get_coca_index()
+        if index:
+            for rank in index.ranks():
+                positions[get_frequency_band(rank)].append(rank)
+        _band_positions = positions
     
-    # Generate seed based on session for consistent randomization
-    random.seed(f"vocab_test_session_{session}")
+    return _band_positions
+
+def _select_test_words(session, words_per_band):
+    """
+    Select the test words for a session
+    
+    Selection is seeded from the session number with a private random
+    generator, so a session always gets the same words and the global random
+    state is left alone.
+    
+    Returns:
+        tuple: Selected test words with rank and band information
+    """
+    index = get_coca_index()
+    bands = get_band_positions()
+    rng = random.Random(f"vocab_test_session_{session}")
     
     # Select words for this session
     selected_words = []
     for band in range(1, NUM_BANDS + 1):
-        band_words = bands.get(band, [])
+        band_positions = bands[band]
         
         # Calculate slice for this session to avoid overlap
         # Each session gets a different slice of words from each band
         total_selections = words_per_band * 3  # 3 sessions
-        if len(band_words) >= total_selections:
+        if len(band_positions) >= total_selections:
             start_idx = (session - 1) * words_per_band
             end_idx = start_idx + words_per_band
-            session_slice = band_words[start_idx:end_idx]
+            session_slice = band_positions[start_idx:end_idx]
         else:
             # If we don't have enough words, just randomly select with replacement
-            session_slice = random.sample(band_words, min(words_per_band, len(band_words)))
+            session_slice = rng.sample(band_positions, min(words_per_band, len(band_positions)))
         
         # Add band information to each word
-        for word_data in session_slice:
-            word_data = word_data.copy()  # Create a copy to avoid modifying the original
-            word_data['band'] = band
-            selected_words.append(word_data)
+        for rank in session_slice:
+            selected_words.append({'word': index.word_at(rank), 'rank': rank, 'band': band})
     
     # Shuffle the words
-    random.shuffle(selected_words)
+    rng.shuffle(selected_words)
+    
+    return tuple(selected_words)
+
+def get_test_words(session, words_per_band=10):
+    """
+    Generate a set of test words for a specific test session
+    
+    Each (session, words_per_band) selection is made once and memoized.
+    
+    Args:
+        session (int): Test session number (1-3)
+        words_per_band (int): Number of words to select from each band
+        
+    Returns:
+        list: Selected test words with rank and band information
+    """
+    index = get_coca_index()
+    if index is None or not len(index):
+        return []
+    
+    key = (session, words_per_band)
+    selected_words = _session_words.get(key)
+    if selected_words is None:
+        selected_words = _session_words[key] = _select_test_words(session, words_per_band)
     
-    return selected_words
+    # Copy so callers cannot modify the memoized selection
+    return [dict(word_data) for word_data in selected_words]
 
 def calculate_vocab_size(answers):
     """
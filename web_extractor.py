@@ -1,44 +1,256 @@
 import os
+import time
+import codecs
+import threading
 import requests
-from bs4 import BeautifulSoup
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse
-from utils import get_app_dirs, get_timestamp_filename, extract_english_words
+from utils import (get_app_dirs, get_timestamp_filename, extract_english_words,
+                   WEB_FETCH_TIMEOUT, WEB_POOL_SIZE, WEB_FETCH_WORKERS,
+                   WEB_CACHE_TTL, WEB_CACHE_MAX_BYTES, WEB_CHUNK_SIZE, WEB_MAX_BYTES)
+from html_text import extract_text, create_text_extractor
+from tokenizer import WordCollector
+from disk_cache import DiskCache
 
 # Get directories
 ATTACHMENT_DIR = get_app_dirs()['ATTACHMENT_DIR']
+CACHE_DIR = get_app_dirs()['CACHE_DIR']
 
-def extract_words_from_webpage(url):
-    """Extract English words from a webpage"""
+# Headers sent with every webpage request
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+}
+
+# Extracted words of fetched pages with their validators, keyed by URL
+_page_cache = DiskCache(os.path.join(CACHE_DIR, 'web'), WEB_CACHE_MAX_BYTES, ttl=WEB_CACHE_TTL)
+
+# Shared HTTP session, created on first use, so connections are reused
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Get the shared HTTP session with a pooled connection adapter"""
+    global _session
+    
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=WEB_POOL_SIZE, pool_maxsize=WEB_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(REQUEST_HEADERS)
+            _session = session
+        return _session
+
+def _get_response_decoder(response):
+    """Get an incremental decoder for a response body's declared charset, defaulting to UTF-8"""
+    encoding = 'utf-8'
+    if 'charset=' in response.headers.get('Content-Type', '').lower() and response.encoding:
+        encoding = response.encoding
     try:
-        # Send a GET request to the URL
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()  # Raise an exception for 4XX/5XX responses
+        return codecs.getincrementaldecoder(encoding)(errors='replace')
+    except LookupError:
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+def _get_content_length(response):
+    """Get the declared body size of a response, or None if it is unknown"""
+    try:
+        return int(response.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+def read_response_words(response, max_bytes=None, target_words=None, progress=None, counts=False):
+    """
+    Tokenize a streamed response body as it arrives
+    
+    Each chunk is decoded, fed to an incremental HTML parser and tokenized
+    before the next one is read, so the full page is never held in memory.
+    With HTML_TEXT_BACKEND=bs4 the decoded body is buffered instead and
+    parsed once reading stops, so target_words cannot end the read early.
+    
+    Args:
+        response (requests.Response): A response opened with stream=True
+        max_bytes (int): Stop reading after this many body bytes
+        target_words (int): Stop reading once this many unique words are found
+        progress (callable): Called as progress(bytes_read, total_bytes) after
+                             each chunk; total_bytes is None without a Content-Length
+        counts (bool): Collect a Counter of occurrences instead of a list
         
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'lxml')
+    Returns:
+        tuple: (sorted unique words or their counts, bytes read, whether
+                reading stopped early)
+    """
+    decoder = _get_response_decoder(response)
+    total_bytes = _get_content_length(response)
+    if total_bytes is not None and max_bytes:
+        total_bytes = min(total_bytes, max_bytes)
+    extractor = create_text_extractor()
+    collector = WordCollector(counts=counts)
+    bytes_read = 0
+    truncated = False
+    
+    for chunk in response.iter_content(chunk_size=WEB_CHUNK_SIZE):
+        if max_bytes and bytes_read + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - bytes_read]
+            truncated = True
+        bytes_read += len(chunk)
+        collector.feed(extractor.feed(decoder.decode(chunk)))
+        if progress:
+            progress(bytes_read, total_bytes)
         
-        # Extract text content and remove HTML tags
-        text = soup.get_text()
+        if target_words and len(collector) >= target_words:
+            truncated = True
+        if truncated:
+            break
+    
+    if not truncated:
+        collector.feed(extractor.feed(decoder.decode(b'', final=True)))
+    collector.feed(extractor.close())
+    return collector.result(), bytes_read, truncated
+
+def _fetch_page_words(url, max_bytes=None, target_words=None, progress=None, counts=False):
+    """
+    Fetch a webpage and extract its English words, using the page cache
+    
+    A cached page is revalidated with If-None-Match / If-Modified-Since and
+    its stored words are reused without parsing when the server answers 304.
+    Otherwise the body is streamed and tokenized as it arrives.
+    
+    Args:
+        url (str): The webpage URL
+        max_bytes (int): Body size cutoff, defaults to WEB_MAX_BYTES
+        target_words (int): Stop reading once this many unique words are found
+        progress (callable): Called as progress(bytes_read, total_bytes)
+        counts (bool): Return a Counter of occurrences instead of a list;
+                       cached pages without recorded counts are fetched again
+    
+    Returns:
+        tuple: (words or Counter, info) where info holds the 'cache' status ('miss',
+               'revalidated' or 'disabled'), 'bytes_read' and 'truncated'
         
-        # Extract unique English words
-        words = extract_english_words(text)
+    Raises:
+        requests.RequestException: If the page cannot be fetched
+    """
+    max_bytes = WEB_MAX_BYTES if max_bytes is None else max_bytes
+    use_cache = WEB_CACHE_TTL > 0
+    entry = _page_cache.get(url) if use_cache else None
+    if counts and entry and 'counts' not in entry:
+        entry = None
+    
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    
+    with get_session().get(url, headers=headers, timeout=WEB_FETCH_TIMEOUT, stream=True) as response:
+        if entry and response.status_code == 304:
+            _page_cache.set(url, entry)  # Restart the entry's time-to-live
+            words = Counter(entry['counts']) if counts else entry['words']
+            return words, {'cache': 'revalidated', 'bytes_read': 0, 'truncated': False}
+        response.raise_for_status()  # Raise an exception for 4XX/5XX responses
         
-        return words
+        words, bytes_read, truncated = read_response_words(response, max_bytes, target_words, progress, counts)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+    
+    # Only complete pages with validators can be revalidated later
+    if use_cache and not truncated and (etag or last_modified):
+        try:
+            entry = {'etag': etag, 'last_modified': last_modified, 'words': sorted(words) if counts else words}
+            if counts:
+                entry['counts'] = dict(words)
+            _page_cache.set(url, entry)
+        except Exception as e:
+            print(f"Error caching webpage words: {e}")
+    
+    info = {
+        'cache': 'miss' if use_cache else 'disabled',
+        'bytes_read': bytes_read,
+        'truncated': truncated
+    }
+    return words, info
+
+def fetch_webpage_words(url, max_bytes=None, target_words=None, progress=None, counts=False):
+    """
+    Fetch a webpage and extract its English words, or their counts
+    
+    Raises:
+        requests.RequestException: If the page cannot be fetched
+    """
+    words, _ = _fetch_page_words(url, max_bytes, target_words, progress, counts)
+    return words
+
+def extract_words_from_webpage(url, max_bytes=None, target_words=None, progress=None, counts=False):
+    """Extract English words, or a Counter of them, from a webpage"""
+    try:
+        return fetch_webpage_words(url, max_bytes, target_words, progress, counts)
     except Exception as e:
         print(f"Error extracting words from webpage: {e}")
-        return []
+        return Counter() if counts else []
+
+def _fetch_timed(url, target_words=None):
+    """Fetch the words of one webpage, recording how long it took and any error"""
+    start = time.perf_counter()
+    try:
+        words, info = _fetch_page_words(url, target_words=target_words)
+        error = None
+    except Exception as e:
+        print(f"Error extracting words from webpage {url}: {e}")
+        words, info = [], {}
+        error = str(e)
+    
+    result = {
+        'url': url,
+        'status': 'error' if error else 'success',
+        'word_count': len(words),
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+    result.update(info)
+    if error:
+        result['error'] = error
+    return result, words
+
+def extract_words_from_webpages(urls, max_workers=None, target_words=None):
+    """
+    Fetch several webpages concurrently and merge their vocabularies
+    
+    Pages are fetched on a bounded thread pool through the shared session.
+    
+    Args:
+        urls (list): URLs to fetch; repeated URLs are fetched once
+        max_workers (int): Fetch threads to use, defaults to WEB_FETCH_WORKERS
+        target_words (int): Stop reading each page once it yields this many unique words
+        
+    Returns:
+        dict: 'words' - sorted unique words from all pages that succeeded,
+              'results' - per-URL status, word count, timing and error
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {'words': [], 'results': []}
+    
+    max_workers = min(max_workers or WEB_FETCH_WORKERS, len(urls))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outcomes = list(executor.map(lambda url: _fetch_timed(url, target_words), urls))
+    
+    unique_words = set()
+    for _, words in outcomes:
+        unique_words.update(words)
+    
+    return {
+        'words': sorted(unique_words),
+        'results': [result for result, _ in outcomes]
+    }
 
 def extract_words_from_html(html_content):
     """Extract English words from HTML content"""
     try:
-        # Parse the HTML content
-        soup = BeautifulSoup(html_content, 'lxml')
-        
         # Extract text content and remove HTML tags
-        text = soup.get_text()
+        text = extract_text(html_content)
         
         # Extract unique English words
         words = extract_english_words(text)
@@ -48,16 +260,15 @@ def extract_words_from_html(html_content):
         print(f"Error extracting words from HTML: {e}")
         return []
 
-def save_webpage_words(url, words):
+def save_webpage_words(url, words, base_name=None):
     """Save extracted words to a file in the attachment folder"""
     try:
         # Get domain from URL for filename
-        domain = urlparse(url).netloc
-        if not domain:
-            domain = "unknown_domain"
+        if base_name is None:
+            base_name = urlparse(url).netloc or "unknown_domain"
         
         # Create a filename with timestamp
-        filename = get_timestamp_filename(domain, "txt")
+        filename = get_timestamp_filename(base_name, "txt")
         file_path = os.path.join(ATTACHMENT_DIR, filename)
         
         # Save words to file
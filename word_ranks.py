@@ -0,0 +1,119 @@
+"""
+COCA frequency ranks for extracted words and vocabulary books
+
+RankLookup annotates words with their COCA60000 rank and the vocabulary
+test's frequency band (1-10, where 1 is the most common 6,000 words). Single
+lookups binary-search the memory-mapped COCA index, and batch lookups merge
+the sorted batch against it (CocaIndex.rank_of_many), so no per-worker
+word -> rank table is built.
+
+Words missing from the list have no rank or band and count as rarer than
+every ranked word when sorting.
+"""
+
+from vocab_count_test import get_coca_index, get_frequency_band, NUM_BANDS
+
+# Ways annotated words can be ordered
+SORT_KEYS = ('rank', 'band', 'book')
+
+# Shared lookup over the COCA index, created on first use
+_rank_lookup = None
+
+
+class RankLookup:
+    """Word -> COCA rank lookups over a CocaIndex"""
+
+    def __init__(self, index):
+        """
+        Initialize the lookup
+
+        Args:
+            index (CocaIndex): Index of the COCA word list
+        """
+        self.index = index
+
+    def rank(self, word):
+        """
+        Get the COCA rank of a word
+
+        Returns:
+            int: The word's rank, or None if it is not in the list
+        """
+        return self.index.rank_of(word.lower())
+
+    def ranks(self, words):
+        """
+        Get the COCA ranks of many words at once
+
+        Args:
+            words (list): Words to look up
+
+        Returns:
+            list: Rank of each word (None where unranked), in input order
+        """
+        return self.index.rank_of_many([word.lower() for word in words])
+
+    def annotate(self, words):
+        """
+        Annotate words with their rank and band
+
+        Returns:
+            list: {'word', 'rank', 'band'} for each word, in input order
+        """
+        return [{'word': word, 'rank': rank, 'band': get_frequency_band(rank) if rank else None}
+                for word, rank in zip(words, self.ranks(words))]
+
+
+def get_rank_lookup():
+    """
+    Get the process-wide rank lookup
+
+    Returns:
+        RankLookup: The lookup, or None if the COCA list is unavailable
+    """
+    global _rank_lookup
+
+    if _rank_lookup is None:
+        index = get_coca_index()
+        if index is not None:
+            _rank_lookup = RankLookup(index)
+
+    return _rank_lookup
+
+
+def sort_ranked(entries, sort='rank', reverse=False):
+    """
+    Order annotated words
+
+    Args:
+        entries (list): Annotated words from RankLookup.annotate
+        sort (str): 'rank' (most common first), 'band' (grouped by band,
+                    keeping the original order within a band) or 'book'
+                    (original order)
+        reverse (bool): Reverse the order, e.g. rarest first
+
+    Returns:
+        list: The entries in the requested order
+    """
+    if sort == 'rank':
+        unranked = float('inf')
+        return sorted(entries, key=lambda entry: entry['rank'] or unranked, reverse=reverse)
+    if sort == 'band':
+        return sorted(entries, key=lambda entry: entry['band'] or NUM_BANDS + 1, reverse=reverse)
+    return entries[::-1] if reverse else list(entries)
+
+
+def count_bands(entries):
+    """
+    Count annotated words per band
+
+    Returns:
+        dict: 'bands' ([{'band', 'count'}] for bands 1-10) and 'unranked' count
+    """
+    counts = [0] * (NUM_BANDS + 2)
+    for entry in entries:
+        counts[entry['band'] or NUM_BANDS + 1] += 1
+    return {
+        'bands': [{'band': band, 'count': counts[band]} for band in range(1, NUM_BANDS + 1)],
+        'unranked': counts[NUM_BANDS + 1]
+    }
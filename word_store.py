@@ -0,0 +1,501 @@
+"""
+In-memory word store for vocabulary books
+
+Each book file is loaded once into an ordered list plus a set and kept in
+memory for the life of the process. Every access stats the file and reloads
+it only when its mtime or size has changed, so edits made by other processes
+or by hand are still picked up. Writes land on disk first and then update the
+cached copy, so the files in the vocabulary directory stay the source of truth.
+
+A book is a <book>.txt snapshot plus an optional <book>.log of operations
+made since the snapshot was written. Each log line is "+word" or "-word", so
+removing words only appends a few bytes instead of rewriting the book. The
+log is replayed over the snapshot on load, and only its new tail is replayed
+when it grows. Once a log passes compact_bytes a background thread folds it
+into a fresh snapshot and deletes it. Additions go straight to the snapshot
+while a book has no pending log, so add-only books never get one.
+
+Writers hold the book's file lock (see file_io) while they refresh and
+modify it, so worker processes sharing the directory never lose each
+other's updates, and snapshots are replaced atomically.
+
+Replay treats "+word" as "add if missing" and "-word" as "remove every
+occurrence", so replaying a log that was already folded into the snapshot
+(e.g. after a crash during compaction) gives the same words.
+
+Alongside the per-book entries the store maintains a reverse index from each
+word to the books that contain it, so finding every book that holds a word
+does not require scanning them.
+"""
+
+import os
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from file_io import file_lock, atomic_write, append_durable
+
+# Log size at which a book's log is folded into its snapshot
+DEFAULT_COMPACT_BYTES = 64 * 1024
+
+# Sorts after every word, bounding a prefix range in the sorted index
+_PREFIX_END = '\U0010ffff'
+
+
+class _BookEntry:
+    """Cached contents of a single book file"""
+
+    __slots__ = ('words', 'word_set', 'signature', 'log_offset', 'sorted_index')
+
+    def __init__(self, words, signature):
+        self.words = words
+        self.word_set = set(words)
+        self.signature = signature
+        # Bytes of the operation log already applied to words
+        self.log_offset = 0
+        # (version, sorted list of (word, position)), built on the first prefix lookup
+        self.sorted_index = None
+
+    @property
+    def version(self):
+        """Identify the book's contents by its file state, the same in every process"""
+        mtime_ns, size = self.signature
+        return f"{mtime_ns:x}-{size:x}-{self.log_offset:x}"
+
+
+def _file_signature(path):
+    """Return (mtime_ns, size) for a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _file_size(path):
+    """Return the size of a file, or 0 if it does not exist"""
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+class WordStore:
+    """Process-wide cache of vocabulary book files"""
+
+    def __init__(self, directory, compact_bytes=DEFAULT_COMPACT_BYTES):
+        """
+        Initialize the word store
+
+        Args:
+            directory (str): Directory holding the <book>.txt files
+            compact_bytes (int): Log size that triggers a background compaction
+        """
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        self._entries = {}
+        # Reverse index: word -> set of book names containing it
+        self._index = {}
+        self._lock = threading.RLock()
+        # Books waiting for the background compactor
+        self._pending_compactions = set()
+        self._compaction_requested = threading.Event()
+        self._compactor = None
+
+    def book_path(self, book_name):
+        """Get the path of a book file"""
+        return os.path.join(self.directory, f"{book_name}.txt")
+
+    def log_path(self, book_name):
+        """Get the path of a book's operation log"""
+        return os.path.join(self.directory, f"{book_name}.log")
+
+    @contextmanager
+    def locked(self, book_name):
+        """
+        Hold a book's cross-process write lock for a batch of operations
+
+        Reads and writes made inside the block see the book as of the time
+        the lock was taken and cannot be interleaved with other writers. File
+        locks are always taken before the store lock, so do not lock another
+        book inside the block.
+        """
+        with file_lock(self.book_path(book_name)), self._lock:
+            yield
+
+    def list_books(self):
+        """Get the names of all books in the directory"""
+        return [file[:-4] for file in os.listdir(self.directory) if file.endswith('.txt')]
+
+    def exists(self, book_name):
+        """Check whether a book exists"""
+        return os.path.exists(self.book_path(book_name))
+
+    def create(self, book_name):
+        """
+        Create an empty book
+
+        Returns:
+            bool: False if the book already exists
+        """
+        with self.locked(book_name):
+            path = self.book_path(book_name)
+            if os.path.exists(path):
+                return False
+            self._remove_log(book_name)
+            atomic_write(path, '')
+            return True
+
+    def _remove_log(self, book_name):
+        """Delete a book's operation log if it has one"""
+        try:
+            os.remove(self.log_path(book_name))
+        except FileNotFoundError:
+            pass
+
+    def _index_add(self, book_name, words):
+        """Record that a book contains the given words"""
+        for word in words:
+            self._index.setdefault(word, set()).add(book_name)
+
+    def _index_discard(self, book_name, words):
+        """Record that a book no longer contains the given words"""
+        for word in words:
+            books = self._index.get(word)
+            if books is not None:
+                books.discard(book_name)
+                if not books:
+                    del self._index[word]
+
+    def _set_entry(self, book_name, entry):
+        """
+        Replace the cached entry for a book and update the reverse index
+
+        Passing None drops the book from the cache. Must be called with the
+        store lock held.
+        """
+        old = self._entries.get(book_name)
+        old_set = old.word_set if old else set()
+        new_set = entry.word_set if entry else set()
+        self._index_discard(book_name, old_set - new_set)
+        self._index_add(book_name, new_set - old_set)
+
+        if entry is None:
+            self._entries.pop(book_name, None)
+        else:
+            self._entries[book_name] = entry
+
+    def _replay_log(self, book_name, entry):
+        """
+        Apply the unread tail of a book's log to its entry
+
+        A trailing partial line (from a write still in progress or a crash)
+        is left for the next replay. Must be called with the store lock held.
+        """
+        try:
+            with open(self.log_path(book_name), 'rb') as f:
+                f.seek(entry.log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return
+        entry.log_offset += end
+
+        removed = set()
+        for line in data[:end].decode('utf-8').splitlines():
+            op, word = line[:1], line[1:]
+            if op == '+' and word not in entry.word_set:
+                if word in removed:
+                    # Drop the old position before the word is re-added at the end
+                    entry.words = [w for w in entry.words if w not in removed]
+                    removed.clear()
+                entry.words.append(word)
+                entry.word_set.add(word)
+            elif op == '-' and word in entry.word_set:
+                entry.word_set.discard(word)
+                removed.add(word)
+        if removed:
+            entry.words = [w for w in entry.words if w not in removed]
+
+    def _load(self, book_name):
+        """
+        Get the cached entry for a book, reloading it if the file changed
+
+        The snapshot is re-read when it changes or the log shrinks (both mean
+        it was compacted); when only the log has grown, just its new records
+        are replayed. Must be called with the store lock held.
+
+        Returns:
+            _BookEntry: The cached entry, or None if the book does not exist
+        """
+        path = self.book_path(book_name)
+        signature = _file_signature(path)
+        if signature is None:
+            self._set_entry(book_name, None)
+            return None
+
+        entry = self._entries.get(book_name)
+        log_size = _file_size(self.log_path(book_name))
+        if entry is None or entry.signature != signature or log_size < entry.log_offset:
+            with open(path, 'r', encoding='utf-8') as f:
+                words = [line.strip() for line in f if line.strip()]
+            entry = _BookEntry(words, signature)
+            self._replay_log(book_name, entry)
+            self._set_entry(book_name, entry)
+        elif log_size > entry.log_offset:
+            old_set = set(entry.word_set)
+            self._replay_log(book_name, entry)
+            self._index_discard(book_name, old_set - entry.word_set)
+            self._index_add(book_name, entry.word_set - old_set)
+        return entry
+
+    def _load_all(self):
+        """
+        Bring every book in the directory up to date in the cache
+
+        Books whose files were deleted are dropped. Must be called with the
+        store lock held.
+        """
+        names = set(self.list_books())
+        for book_name in list(self._entries):
+            if book_name not in names:
+                self._set_entry(book_name, None)
+        for book_name in names:
+            self._load(book_name)
+
+    def get_words(self, book_name):
+        """
+        Get the words of a book in file order
+
+        Returns:
+            list: A copy of the book's words, empty if the book does not exist
+        """
+        with self._lock:
+            entry = self._load(book_name)
+            return list(entry.words) if entry else []
+
+    def get_word_set(self, book_name):
+        """
+        Get the words of a book as a set for membership checks
+
+        Returns:
+            frozenset: The book's words, empty if the book does not exist
+        """
+        with self._lock:
+            entry = self._load(book_name)
+            return frozenset(entry.word_set) if entry else frozenset()
+
+    def contains(self, book_name, word):
+        """Check whether a book contains a word"""
+        with self._lock:
+            entry = self._load(book_name)
+            return entry is not None and word in entry.word_set
+
+    def get_version(self, book_name):
+        """
+        Get a string that changes whenever a book's contents change
+
+        Returns:
+            str: The book's version, or None if the book does not exist
+        """
+        with self._lock:
+            entry = self._load(book_name)
+            return entry.version if entry else None
+
+    def _sorted_index(self, entry):
+        """Get an entry's (word, position) pairs sorted by word, rebuilding them if stale"""
+        version = entry.version
+        if entry.sorted_index is None or entry.sorted_index[0] != version:
+            index = sorted((word, position) for position, word in enumerate(entry.words))
+            entry.sorted_index = (version, index)
+        return entry.sorted_index[1]
+
+    def get_page(self, book_name, offset=0, limit=None, prefix=None):
+        """
+        Get a slice of a book's words in file order without copying the whole book
+
+        Words starting with prefix are found by bisecting an index of the
+        book's words sorted alphabetically, which is built once per version of
+        the book.
+
+        Args:
+            book_name (str): Name of the book
+            offset (int): Number of matching words to skip
+            limit (int): Maximum number of words to return, None for all
+            prefix (str): Only return words starting with this prefix
+
+        Returns:
+            tuple: (words on the page, total number of matching words)
+        """
+        end = None if limit is None else offset + limit
+        with self._lock:
+            entry = self._load(book_name)
+            if entry is None:
+                return [], 0
+            if not prefix:
+                return entry.words[offset:end], len(entry.words)
+
+            index = self._sorted_index(entry)
+            start = bisect_left(index, (prefix,))
+            stop = bisect_left(index, (prefix + _PREFIX_END,), start)
+            positions = sorted(position for _, position in index[start:stop])
+            return [entry.words[position] for position in positions[offset:end]], len(positions)
+
+    def _append_log(self, book_name, records):
+        """
+        Append operation records to a book's log and apply them to the cache
+
+        Schedules a compaction once the log passes compact_bytes. Must be
+        called with the book locked.
+        """
+        entry = self._load(book_name)
+        log_path = self.log_path(book_name)
+        if _file_size(log_path) > entry.log_offset:
+            # Drop a record left unfinished by a crashed writer
+            os.truncate(log_path, entry.log_offset)
+        append_durable(log_path, ''.join(f"{record}\n" for record in records))
+        self._load(book_name)
+
+        if _file_size(log_path) >= self.compact_bytes:
+            self._schedule_compaction(book_name)
+
+    def append(self, book_name, words):
+        """
+        Append words to a book file, creating it if needed
+
+        The caller is responsible for deduplication; every word given is
+        written to the snapshot. While the book has a pending log the words
+        are logged instead, and any already in the book are skipped.
+        """
+        if not words:
+            return
+        with self.locked(book_name):
+            entry = self._load(book_name)
+            if entry is not None and _file_size(self.log_path(book_name)):
+                self._append_log(book_name, [f"+{word}" for word in words])
+                return
+
+            if entry is None:
+                # A log left behind by a deleted book must not apply to a new one
+                self._remove_log(book_name)
+            path = self.book_path(book_name)
+            append_durable(path, ''.join(f"{word}\n" for word in words))
+
+            signature = _file_signature(path)
+            if entry is None:
+                self._set_entry(book_name, _BookEntry(list(words), signature))
+            else:
+                self._index_add(book_name, [w for w in words if w not in entry.word_set])
+                entry.words.extend(words)
+                entry.word_set.update(words)
+                entry.signature = signature
+
+    def rewrite(self, book_name, words):
+        """
+        Replace the contents of a book file with the given words
+
+        The new snapshot is written to a temporary file and moved into place
+        before the book's log is deleted.
+        """
+        with self.locked(book_name):
+            path = self.book_path(book_name)
+            atomic_write(path, '\n'.join(words) + ('\n' if words else ''))
+            self._remove_log(book_name)
+            self._set_entry(book_name, _BookEntry(list(words), _file_signature(path)))
+
+    def remove(self, book_name, word):
+        """
+        Remove every occurrence of a word from a book
+
+        Returns:
+            bool: True if the word was present and a removal was logged
+        """
+        return self.remove_words(book_name, {word}) > 0
+
+    def remove_words(self, book_name, words):
+        """
+        Remove a set of words from a book by appending removals to its log
+
+        Args:
+            book_name (str): Name of the book
+            words (set): Words to remove
+
+        Returns:
+            int: Number of distinct words that were present and removed
+        """
+        with self.locked(book_name):
+            entry = self._load(book_name)
+            if entry is None:
+                return 0
+            present = entry.word_set.intersection(words)
+            if present:
+                self._append_log(book_name, [f"-{word}" for word in sorted(present)])
+            return len(present)
+
+    def compact(self, book_name):
+        """
+        Fold a book's log into its snapshot
+
+        Returns:
+            bool: True if there was a log to fold
+        """
+        with self.locked(book_name):
+            entry = self._load(book_name)
+            if entry is None or not _file_size(self.log_path(book_name)):
+                return False
+            self.rewrite(book_name, entry.words)
+            return True
+
+    def _schedule_compaction(self, book_name):
+        """Queue a book for the background compactor, starting it if needed"""
+        with self._lock:
+            self._pending_compactions.add(book_name)
+            if self._compactor is None:
+                self._compactor = threading.Thread(target=self._run_compactor,
+                                                   name='word-store-compactor', daemon=True)
+                self._compactor.start()
+        self._compaction_requested.set()
+
+    def _run_compactor(self):
+        """Compact queued books for the life of the process"""
+        while True:
+            self._compaction_requested.wait()
+            with self._lock:
+                self._compaction_requested.clear()
+                pending, self._pending_compactions = self._pending_compactions, set()
+            for book_name in pending:
+                try:
+                    self.compact(book_name)
+                except Exception as e:
+                    print(f"Error compacting book {book_name}: {e}")
+
+    def books_containing(self, word):
+        """
+        Find every book that contains a word using the reverse index
+
+        Returns:
+            list: Sorted names of the books holding the word
+        """
+        with self._lock:
+            self._load_all()
+            return sorted(self._index.get(word, ()))
+
+    def books_containing_words(self, words):
+        """
+        Group words by the books that contain them using the reverse index
+
+        Args:
+            words (iterable): Words to look up
+
+        Returns:
+            dict: Book name -> set of the given words found in that book
+        """
+        by_book = {}
+        with self._lock:
+            self._load_all()
+            for word in words:
+                for book_name in self._index.get(word, ()):
+                    by_book.setdefault(book_name, set()).add(word)
+        return by_book